@@ -0,0 +1,226 @@
+# admission.py
+"""
+Admission control for uploads/analyses.
+
+Every job declares an estimate (bytes it will extract, memory it will need) and must be
+admitted before it extracts anything. Global limits cap in-flight jobs, extracted bytes
+and estimated memory; excess work waits in a bounded queue or is rejected with a
+retry-after hint. Waiting jobs are served round-robin across submitters, and a single
+submitter can hold at most MAX_JOBS_PER_SUBMITTER slots, so one analyst pushing a
+large batch can't starve the others. A job that has waited longer than STARVATION_WAIT
+without fitting (typically one larger than MAX_EXTRACT_BYTES, which only runs alone)
+stops further admissions until the in-flight work drains and it can start.
+"""
+import os
+import time
+import asyncio
+from collections import deque, OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Deque
+
+MB = 1024 * 1024
+MAX_JOBS = int(os.getenv("STAGEZERO_MAX_JOBS", str(max(2, (os.cpu_count() or 2) // 2))))
+MAX_JOBS_PER_SUBMITTER = int(os.getenv("STAGEZERO_MAX_JOBS_PER_SUBMITTER", str(max(1, MAX_JOBS // 2))))
+MAX_EXTRACT_BYTES = int(os.getenv("STAGEZERO_MAX_EXTRACT_MB", "4096")) * MB
+MAX_MEMORY_BYTES = int(os.getenv("STAGEZERO_MAX_MEMORY_MB", "8192")) * MB
+MAX_QUEUE = int(os.getenv("STAGEZERO_MAX_QUEUE", "32"))
+MAX_WAIT = float(os.getenv("STAGEZERO_MAX_WAIT_S", "120"))
+STARVATION_WAIT = float(os.getenv("STAGEZERO_STARVATION_S", str(MAX_WAIT / 4)))
+
+# loaded logs are held as str, then classified copies with IOC lists are built on top
+MEMORY_PER_EXTRACTED_BYTE = 3
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("submitter", "nbytes", "memory", "future", "enqueued")
+
+    def __init__(self, submitter: str, nbytes: int, memory: int, since: Optional[float] = None):
+        self.submitter = submitter
+        self.nbytes = nbytes
+        self.memory = memory
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued = since if since is not None else time.monotonic()
+
+class AdmissionController:
+    """Single-event-loop controller; all state changes happen on the loop thread."""
+
+    def __init__(self, max_jobs: int = MAX_JOBS, max_extract_bytes: int = MAX_EXTRACT_BYTES,
+                 max_memory: int = MAX_MEMORY_BYTES, max_queue: int = MAX_QUEUE,
+                 max_wait: float = MAX_WAIT, max_per_submitter: int = MAX_JOBS_PER_SUBMITTER,
+                 starvation_wait: float = STARVATION_WAIT):
+        self.max_jobs = max_jobs
+        self.max_extract_bytes = max_extract_bytes
+        self.max_memory = max_memory
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_per_submitter = max_per_submitter
+        self.starvation_wait = starvation_wait
+
+        self.in_flight = 0
+        self.bytes_in_flight = 0
+        self.memory_in_flight = 0
+        self.per_submitter: Dict[str, int] = {}
+        # submitter -> its waiting jobs; order of keys is the round-robin rotation
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.recent_durations: Deque[float] = deque(maxlen=50)
+
+    # ---- accounting ----
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def _fits(self, w: _Waiter) -> bool:
+        if self.per_submitter.get(w.submitter, 0) >= self.max_per_submitter:
+            return False
+        if self.in_flight == 0:
+            # an oversized job still runs, just alone
+            return True
+        return (self.in_flight < self.max_jobs
+                and self.bytes_in_flight + w.nbytes <= self.max_extract_bytes
+                and self.memory_in_flight + w.memory <= self.max_memory)
+
+    def _start(self, w: _Waiter):
+        self.in_flight += 1
+        self.bytes_in_flight += w.nbytes
+        self.memory_in_flight += w.memory
+        self.per_submitter[w.submitter] = self.per_submitter.get(w.submitter, 0) + 1
+        waited = time.monotonic() - w.enqueued
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def _finish(self, w: _Waiter, duration: float):
+        self.in_flight -= 1
+        self.bytes_in_flight -= w.nbytes
+        self.memory_in_flight -= w.memory
+        self.per_submitter[w.submitter] -= 1
+        if not self.per_submitter[w.submitter]:
+            del self.per_submitter[w.submitter]
+        self.recent_durations.append(duration)
+        self._dispatch()
+
+    def _starved(self) -> Optional[_Waiter]:
+        """Oldest head-of-line job that has waited past starvation_wait, if any."""
+        now = time.monotonic()
+        oldest = None
+        for q in self.queues.values():
+            w = q[0] if q else None
+            if (w is None or w.future.done() or now - w.enqueued < self.starvation_wait
+                    or self.per_submitter.get(w.submitter, 0) >= self.max_per_submitter):
+                continue
+            if oldest is None or w.enqueued < oldest.enqueued:
+                oldest = w
+        return oldest
+
+    def _admit_waiter(self, w: _Waiter):
+        q = self.queues[w.submitter]
+        q.popleft()
+        self._start(w)
+        w.future.set_result(True)
+        # served: move this submitter to the back of the rotation
+        self.queues.move_to_end(w.submitter)
+        if not q:
+            del self.queues[w.submitter]
+
+    def _dispatch(self):
+        """Admit queued jobs, one per submitter per round, while capacity allows."""
+        progressed = True
+        while progressed and self.queues:
+            progressed = False
+            for submitter in list(self.queues):
+                q = self.queues[submitter]
+                while q and q[0].future.done():  # timed out / cancelled
+                    q.popleft()
+                if not q:
+                    del self.queues[submitter]
+
+            starved = self._starved()
+            if starved is not None:
+                # admit nothing else until the starved job fits; in-flight jobs drain meanwhile
+                if self._fits(starved):
+                    self._admit_waiter(starved)
+                    progressed = True
+                continue
+
+            for submitter in list(self.queues):
+                q = self.queues[submitter]
+                if self._fits(q[0]):
+                    self._admit_waiter(q[0])
+                    progressed = True
+
+    def retry_after(self) -> int:
+        avg = sum(self.recent_durations) / len(self.recent_durations) if self.recent_durations else 30.0
+        rounds = 1 + self.queue_depth() // max(1, self.max_jobs)
+        return max(1, int(avg * rounds))
+
+    # ---- public API ----
+    @asynccontextmanager
+    async def admit(self, submitter: str, nbytes: int, memory: Optional[int] = None,
+                    since: Optional[float] = None):
+        """
+        Hold a slot for the duration of the block. Raises AdmissionRejected when the
+        queue is full or the job waited longer than max_wait. A retry passes the
+        time.monotonic() of its first attempt as `since` to keep its seniority.
+        """
+        w = _Waiter(submitter, nbytes, memory if memory is not None else nbytes * MEMORY_PER_EXTRACTED_BYTE,
+                    since)
+        if not self.queues and self._fits(w):
+            self._start(w)
+        else:
+            if self.queue_depth() >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected("queue_full", self.retry_after())
+            self.queues.setdefault(submitter, deque()).append(w)
+            # may start right away if only other submitters' capped jobs are waiting
+            self._dispatch()
+            try:
+                await asyncio.wait_for(asyncio.shield(w.future), timeout=self.max_wait)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if w.future.done() and not w.future.cancelled():
+                    # admitted right as we gave up: hand the slot back
+                    self._finish(w, 0.0)
+                else:
+                    w.future.cancel()
+                    self._dispatch()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.rejected += 1
+                raise AdmissionRejected("wait_timeout", self.retry_after())
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._finish(w, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "bytes_in_flight": self.bytes_in_flight,
+            "memory_in_flight": self.memory_in_flight,
+            "queue_depth": self.queue_depth(),
+            "queued_by_submitter": {s: len(q) for s, q in self.queues.items()},
+            "running_by_submitter": dict(self.per_submitter),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_s": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+            "max_wait_s": round(self.max_wait_seen, 3),
+            "limits": {
+                "max_jobs": self.max_jobs,
+                "max_jobs_per_submitter": self.max_per_submitter,
+                "max_extract_bytes": self.max_extract_bytes,
+                "max_memory_bytes": self.max_memory,
+                "max_queue": self.max_queue,
+                "max_wait_s": self.max_wait,
+                "starvation_wait_s": self.starvation_wait,
+            },
+        }
@@ -4,9 +4,14 @@ import requests
 from fastapi import FastAPI
 from pydantic import BaseModel
 import shutil
-from fastapi import FastAPI, File, UploadFile, Form
+from typing import Optional
+from fastapi import FastAPI, File, UploadFile, Form, Request, Query
+from fastapi.responses import JSONResponse
 
-app = FastAPI()
+from job_store import JobNotFound, load_classified
+from serialization import FastJSONResponse, negotiated_response, export_payload
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Paths & Configs
 UPLOAD_DIR = "uploads"
@@ -21,11 +26,12 @@ class CommandRequest(BaseModel):
 
 # --- Endpoints ---
 @app.get("/classify")
-def classify_logs():
-    """Return locally classified logs."""
-    with open(CLASSIFIED_LOGS_JSON, "r", encoding="utf-8") as f:
-        classified_logs = json.load(f)
-    return classified_logs
+def classify_logs(request: Request, job_id: Optional[str] = None):
+    """Return locally classified logs (JSON or MessagePack, compressed per Accept-Encoding)."""
+    try:
+        return negotiated_response(request, load_classified(job_id))
+    except (FileNotFoundError, JobNotFound):
+        return JSONResponse({"error": "No classified logs found."}, status_code=404)
 
 @app.get("/sample")
 def sample_log():
@@ -33,19 +39,25 @@ def sample_log():
     return {"example": "Log classification API running locally."}
 
 @app.get("/send_to_watsonx")
-def send_to_watsonx():
-    """Send classified logs to Watsonx project."""
-    with open(CLASSIFIED_LOGS_JSON, "r", encoding="utf-8") as f:
-        classified_logs = json.load(f)
+def send_to_watsonx(job_id: Optional[str] = None, fmt: str = Query("json", alias="format")):
+    """Send classified logs to Watsonx project (format=json or msgpack)."""
+    try:
+        classified_logs = load_classified(job_id)
+    except (FileNotFoundError, JobNotFound):
+        return JSONResponse({"status": "error", "detail": "No classified logs found."}, status_code=404)
 
     url = f"{WATSONX_URL}/v1/projects/{PROJECT_ID}/ingest"
+    try:
+        body, content_type = export_payload(classified_logs, fmt)
+    except RuntimeError as e:
+        return JSONResponse({"status": "error", "detail": str(e)}, status_code=400)
     headers = {
         "Authorization": f"Bearer {WATSONX_API_KEY}",
-        "Content-Type": "application/json"
+        "Content-Type": content_type
     }
 
     try:
-        response = requests.post(url, headers=headers, json=classified_logs)
+        response = requests.post(url, headers=headers, data=body)
         response.raise_for_status()
         return {"status": "success", "watsonx_response": response.json()}
     except requests.exceptions.RequestException as e:
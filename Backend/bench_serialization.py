@@ -0,0 +1,76 @@
+# bench_serialization.py
+"""
+Encode time and payload size: previous path (stdlib json, indent=2 for files, FastAPI
+jsonable_encoder + JSONResponse for responses) vs. the serialization layer.
+
+Usage:
+    python bench_serialization.py                      # synthetic classified payload
+    python bench_serialization.py classified_logs.json # real output file
+"""
+import sys
+import gzip
+import json
+import time
+import random
+from typing import Any, Callable, List, Dict
+
+from fastapi.encoders import jsonable_encoder
+
+import serialization as ser
+
+def synthetic_classified(n: int = 5000, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    tactics = ["execution", "persistence", "defense-evasion", "discovery", "command-and-control"]
+    out = []
+    for i in range(n):
+        out.append({
+            "filename": f"logs/host{i % 40}/Security_{i}.json",
+            "text": " ".join(rng.choice(["powershell", "net user /domain", "rundll32", "svchost.exe", "4624",
+                                         "10.0.%d.%d" % (rng.randint(0, 255), rng.randint(0, 255))])
+                             for _ in range(rng.randint(20, 120))),
+            "iocs": {"ipv4": [f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}" for _ in range(rng.randint(0, 6))],
+                     "domain": [f"host{rng.randint(0, 999)}.corp.example" for _ in range(rng.randint(0, 3))],
+                     "hash": ["%064x" % rng.getrandbits(256) for _ in range(rng.randint(0, 2))]},
+            "matched": [{"id": f"T{rng.randint(1000, 1600)}", "name": "Technique", "tactics": rng.sample(tactics, 2),
+                         "match_type": rng.choice(["full", "partial"]), "score": round(rng.uniform(1, 4), 3)}
+                        for _ in range(rng.randint(0, 8))],
+            "file_risk_score": round(rng.uniform(0, 60), 3),
+        })
+    return out
+
+def timed(fn: Callable[[], bytes], repeat: int = 5):
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+def main():
+    payload = ser.read_json(sys.argv[1]) if len(sys.argv) > 1 else synthetic_classified()
+
+    cases = [
+        ("file: json.dumps indent=2 (before)", lambda: json.dumps(payload, indent=2).encode()),
+        ("file: serialization.dumps (after)", lambda: ser.dumps(payload)),
+        ("http: jsonable_encoder + json (before)",
+         lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode()),
+        ("http: serialization.dumps (after)", lambda: ser.dumps(payload)),
+    ]
+    if ser.msgpack is not None:
+        cases.append(("http: msgpack", lambda: ser.pack(payload)))
+
+    print(f"encoder: {'orjson' if ser.orjson else 'stdlib json'}; "
+          f"msgpack: {'yes' if ser.msgpack else 'no'}; brotli: {'yes' if ser.brotli else 'no'}")
+    print(f"{'case':42} {'encode ms':>10} {'raw KB':>10} {'gzip KB':>10} {'gzip ms':>9} {'br KB':>10} {'br ms':>9}")
+    for label, fn in cases:
+        ms, body = timed(fn)
+        gz_ms, gz = timed(lambda: gzip.compress(body, compresslevel=ser.GZIP_LEVEL), repeat=2)
+        row = f"{label:42} {ms:10.1f} {len(body) / 1024:10.1f} {len(gz) / 1024:10.1f} {gz_ms:9.1f}"
+        if ser.brotli is not None:
+            br_ms, br = timed(lambda: ser.brotli.compress(body, quality=ser.BROTLI_QUALITY), repeat=2)
+            row += f" {len(br) / 1024:10.1f} {br_ms:9.1f}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import json
 import re
 from collections import defaultdict
 
+from serialization import write_json
+
 # --------------------------
 # Paths
 # --------------------------
@@ -79,8 +81,7 @@ for log in logs:
 # --------------------------
 # Save results
 # --------------------------
-with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-    json.dump(classified_logs, f, indent=2)
+write_json(OUTPUT_FILE, classified_logs)
 
 total_matches = sum(1 for x in classified_logs if x["matched"])
 print(f"✅ Classified {len(classified_logs)} logs")
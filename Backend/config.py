@@ -1,15 +1,7 @@
-from ibm_watsonxdata import DataClient
-from ibm_watsonx_ai import AIClient
-from ibm_watson import AssistantV2
-
 # Watsonx API
 API_KEY = "YOUR_WATSONX_API_KEY"
 URL = "https://YOUR_WATSONX_URL"
 
-# Initialize clients
-data_client = DataClient(api_key=API_KEY, url=URL)
-ai_client = AIClient(api_key=API_KEY, url=URL)
-
 # watsonx.data collection ID for storing logs
 COLLECTION_ID = "your_cloud_collection_id"
 
@@ -21,11 +13,37 @@ ASSISTANT_API_KEY = "YOUR_ASSISTANT_API_KEY"
 ASSISTANT_URL = "https://YOUR_ASSISTANT_URL"
 ASSISTANT_ID = "YOUR_ASSISTANT_ID"
 
-assistant = AssistantV2(
-    version='2025-08-29',
-    iam_apikey=ASSISTANT_API_KEY,
-    url=ASSISTANT_URL
-)
-
 # Path to your local logs folder
-LOG_FOLDER = "logs_folder"
\ No newline at end of file
+LOG_FOLDER = "logs_folder"
+
+# Clients (data_client, ai_client, assistant) are built on first attribute access,
+# so importing config doesn't pull in the IBM SDKs or open connections.
+def _make_data_client():
+    from ibm_watsonxdata import DataClient
+    return DataClient(api_key=API_KEY, url=URL)
+
+def _make_ai_client():
+    from ibm_watsonx_ai import AIClient
+    return AIClient(api_key=API_KEY, url=URL)
+
+def _make_assistant():
+    from ibm_watson import AssistantV2
+    return AssistantV2(
+        version='2025-08-29',
+        iam_apikey=ASSISTANT_API_KEY,
+        url=ASSISTANT_URL
+    )
+
+_CLIENT_FACTORIES = {
+    "data_client": _make_data_client,
+    "ai_client": _make_ai_client,
+    "assistant": _make_assistant,
+}
+
+def __getattr__(name):
+    factory = _CLIENT_FACTORIES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    client = factory()
+    globals()[name] = client  # cache: later lookups bypass __getattr__
+    return client
@@ -0,0 +1,267 @@
+# distributed.py
+"""
+Sharded classification across several worker processes / hosts.
+
+The coordinator splits loaded logs into shards, POSTs each shard to a worker's
+/classify-shard endpoint, and merges the classified entries in input order. A worker
+that can't be reached or times out is taken out of rotation and its shard is
+re-dispatched to the remaining workers; a shard the worker rejects (5xx, bad body) is
+re-queued without dropping the worker, so one poison shard can only fail the run after
+MAX_ATTEMPTS tries instead of knocking every healthy worker out. The deep report is
+built from the merged entries (--report), as for a single-process run.
+
+Usage:
+    # on each worker host
+    python distributed.py worker --port 8101
+
+    # coordinator, remote workers
+    python distributed.py coordinator --workers http://10.0.0.5:8101,http://10.0.0.6:8101
+
+    # coordinator, everything on this machine
+    python distributed.py coordinator --local-workers 4
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import subprocess
+from collections import Counter
+from typing import List, Dict, Any
+
+import requests
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from main import classify_logs_pipeline, build_deep_report, CLASSIFIED_LOGS_JSON
+from serialization import FastJSONResponse, dumps, loads, read_json, write_json
+
+# -------------------- Configuration --------------------
+ALL_LOGS_JSON = os.path.join(os.getcwd(), "all_logs.json")
+SHARD_MAX_LOGS = 500
+SHARD_MAX_BYTES = 8 * 1024 * 1024  # text per shard; keeps request bodies reasonable
+SHARD_TIMEOUT = 300  # seconds a worker gets for one shard
+MAX_ATTEMPTS = 3  # dispatches per shard before the run is failed
+MAX_WORKER_ERRORS = 3  # consecutive rejected shards before a reachable worker is dropped anyway
+LOCAL_BASE_PORT = 8101
+
+# -------------------- Worker --------------------
+class Shard(BaseModel):
+    shard_id: int
+    logs: List[Dict[str, Any]]
+
+worker_app = FastAPI(title="StageZero classification worker", default_response_class=FastJSONResponse)
+
+@worker_app.get("/health")
+def worker_health():
+    return {"status": "ok", "pid": os.getpid()}
+
+@worker_app.post("/classify-shard")
+def classify_shard(shard: Shard):
+    classified = classify_logs_pipeline(shard.logs)
+    # returned as a Response so FastAPI skips jsonable_encoder on the (large) shard
+    return FastJSONResponse({"shard_id": shard.shard_id, "classified": classified})
+
+# -------------------- Coordinator --------------------
+def make_shards(all_logs: List[Dict[str, Any]], max_logs: int = SHARD_MAX_LOGS,
+                max_bytes: int = SHARD_MAX_BYTES) -> List[List[Dict[str, Any]]]:
+    """Split logs into contiguous shards bounded by entry count and text size."""
+    shards: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    size = 0
+    for entry in all_logs:
+        n = len(entry.get("text", ""))
+        if current and (len(current) >= max_logs or size + n > max_bytes):
+            shards.append(current)
+            current, size = [], 0
+        current.append(entry)
+        size += n
+    if current:
+        shards.append(current)
+    return shards
+
+class Coordinator:
+    def __init__(self, workers: List[str], timeout: float = SHARD_TIMEOUT, max_attempts: int = MAX_ATTEMPTS,
+                 max_worker_errors: int = MAX_WORKER_ERRORS):
+        self.workers = [w.rstrip("/") for w in workers]
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_worker_errors = max_worker_errors
+
+    def healthy_workers(self) -> List[str]:
+        alive = []
+        for w in self.workers:
+            try:
+                requests.get(f"{w}/health", timeout=5).raise_for_status()
+                alive.append(w)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Worker {w} unavailable: {e}")
+        return alive
+
+    def run(self, all_logs: List[Dict[str, Any]], **shard_opts) -> List[Dict[str, Any]]:
+        """Classify all_logs on the worker pool; entries come back in input order."""
+        shards = make_shards(all_logs, **shard_opts)
+        workers = self.healthy_workers()
+        if not workers:
+            raise RuntimeError("No healthy workers available")
+
+        todo: "queue.Queue[int]" = queue.Queue()
+        for sid in range(len(shards)):
+            todo.put(sid)
+        attempts = Counter()
+        results: Dict[int, Dict[str, Any]] = {}
+        lock = threading.Lock()
+        failed: List[str] = []
+
+        def remaining() -> int:
+            with lock:
+                return len(shards) - len(results)
+
+        def serve(worker: str):
+            errors = 0  # consecutive rejected shards on this worker
+            while remaining() > 0 and not failed:
+                try:
+                    sid = todo.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                with lock:
+                    attempts[sid] += 1
+                done = False
+                try:
+                    r = requests.post(f"{worker}/classify-shard",
+                                      data=dumps({"shard_id": sid, "logs": shards[sid]}),
+                                      headers={"Content-Type": "application/json"},
+                                      timeout=self.timeout)
+                    r.raise_for_status()
+                    result = loads(r.content)
+                    with lock:
+                        results[sid] = result
+                    done = True
+                    errors = 0
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    print(f"⚠️ Worker {worker} unreachable on shard {sid}: {e}; dropping it")
+                    self._count_failure(sid, attempts, failed, lock)
+                    # take the worker out of rotation; the others pick the shard up
+                    return
+                except Exception as e:
+                    # 5xx or a body that isn't valid JSON: likely the shard, so keep the worker
+                    print(f"⚠️ Worker {worker} failed shard {sid}: {e}; re-dispatching")
+                    self._count_failure(sid, attempts, failed, lock)
+                    errors += 1
+                    if errors >= self.max_worker_errors:
+                        print(f"⚠️ Worker {worker} rejected {errors} shards in a row; dropping it")
+                        return
+                finally:
+                    # a shard taken off the queue always goes back unless it completed
+                    if not done:
+                        todo.put(sid)
+
+        threads = [threading.Thread(target=serve, args=(w,), daemon=True) for w in workers]
+        for t in threads:
+            t.start()
+        # wait for completion, a hard failure, or every worker thread having died
+        while remaining() > 0 and not failed and any(t.is_alive() for t in threads):
+            time.sleep(0.05)
+        for t in threads:
+            t.join()
+
+        if failed:
+            raise RuntimeError("; ".join(failed))
+        if len(results) < len(shards):
+            raise RuntimeError(f"All workers failed with {len(shards) - len(results)} shards left")
+
+        classified: List[Dict[str, Any]] = []
+        for sid in range(len(shards)):
+            classified.extend(results[sid]["classified"])
+        return classified
+
+    def _count_failure(self, sid: int, attempts: Counter, failed: List[str], lock: threading.Lock):
+        with lock:
+            if attempts[sid] >= self.max_attempts:
+                failed.append(f"shard {sid} failed {attempts[sid]} times")
+
+# -------------------- Local workers --------------------
+def spawn_local_workers(n: int, base_port: int = LOCAL_BASE_PORT, startup_timeout: float = 60) -> List[subprocess.Popen]:
+    """Start n worker processes on localhost and wait for them to answer /health."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    procs = []
+    for i in range(n):
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(here, "distributed.py"), "worker", "--port", str(base_port + i)],
+            cwd=os.getcwd(),
+        ))
+
+    deadline = time.time() + startup_timeout
+    for i in range(n):
+        url = f"http://127.0.0.1:{base_port + i}/health"
+        while True:
+            try:
+                requests.get(url, timeout=1).raise_for_status()
+                break
+            except requests.exceptions.RequestException:
+                if time.time() > deadline or procs[i].poll() is not None:
+                    stop_local_workers(procs)
+                    raise RuntimeError(f"Local worker on port {base_port + i} did not start")
+                time.sleep(0.2)
+    return procs
+
+def stop_local_workers(procs: List[subprocess.Popen]):
+    for p in procs:
+        if p.poll() is None:
+            p.terminate()
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+# -------------------- CLI --------------------
+def run_coordinator(args):
+    all_logs = read_json(args.input)
+
+    procs: List[subprocess.Popen] = []
+    if args.local_workers:
+        procs = spawn_local_workers(args.local_workers, args.base_port)
+        workers = [f"http://127.0.0.1:{args.base_port + i}" for i in range(args.local_workers)]
+    else:
+        workers = [w for w in args.workers.split(",") if w]
+
+    try:
+        start = time.time()
+        classified = Coordinator(workers).run(all_logs, max_logs=args.shard_size)
+        print(f"✅ Classified {len(classified)} logs on {len(workers)} workers in {time.time() - start:.1f}s")
+    finally:
+        stop_local_workers(procs)
+
+    write_json(args.output, classified)
+    if args.report:
+        build_deep_report(classified)
+        print("📝 Report written to report.md")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed log classification.")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    w = sub.add_parser("worker", help="serve /classify-shard")
+    w.add_argument("--host", default="0.0.0.0")
+    w.add_argument("--port", type=int, default=LOCAL_BASE_PORT)
+
+    c = sub.add_parser("coordinator", help="shard all_logs.json across workers")
+    c.add_argument("--workers", default=os.getenv("STAGEZERO_WORKERS", ""),
+                   help="comma separated worker base URLs")
+    c.add_argument("--local-workers", type=int, default=0, help="spawn N workers on localhost")
+    c.add_argument("--base-port", type=int, default=LOCAL_BASE_PORT)
+    c.add_argument("--shard-size", type=int, default=SHARD_MAX_LOGS)
+    c.add_argument("--input", default=ALL_LOGS_JSON)
+    c.add_argument("--output", default=CLASSIFIED_LOGS_JSON)
+    c.add_argument("--report", action="store_true", help="also write report.md")
+    args = parser.parse_args()
+
+    if args.role == "worker":
+        import uvicorn
+        uvicorn.run(worker_app, host=args.host, port=args.port, log_level="warning")
+    else:
+        if not args.workers and not args.local_workers:
+            parser.error("pass --workers or --local-workers")
+        run_coordinator(args)
@@ -3,12 +3,18 @@ import json
 import chardet
 import requests
 import os
-from fastapi import FastAPI
-
-app = FastAPI(title="Hackverse Log Pipeline")
+from typing import Optional
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
 
+# before the job store import: JOBS_DIR and the legacy output paths resolve against the cwd
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+from job_store import JobNotFound, classified_path
+from serialization import export_payload
+
+app = FastAPI(title="Hackverse Log Pipeline")
+
 
 # Config
 LOAD_LOGS_SCRIPT = "load_logs.py"
@@ -46,15 +52,16 @@ def read_json_auto_encoding(file_path):
         return json.load(f)
     
 
-def send_to_watsonx(file_path):
-    """Send classified logs to Watsonx."""
+def send_to_watsonx(file_path, fmt="json"):
+    """Send classified logs to Watsonx (fmt: json or msgpack; RuntimeError if msgpack is missing)."""
     classified_logs = read_json_auto_encoding(file_path)
     url = f"{WATSONX_URL}/v1/projects/{PROJECT_ID}/ingest"
+    body, content_type = export_payload(classified_logs, fmt)
     headers = {
         "Authorization": f"Bearer {WATSONX_API_KEY}",
-        "Content-Type": "application/json"
+        "Content-Type": content_type
     }
-    response = requests.post(url, headers=headers, json=classified_logs)
+    response = requests.post(url, headers=headers, data=body)
     response.raise_for_status()
     print("Logs successfully sent to Watsonx!")
 
@@ -83,9 +90,15 @@ def classify_logs():
     return {"status": "success", "output": output, "classified_logs_file": CLASSIFIED_LOGS_JSON}
 
 @app.get("/send_to_watsonx")
-def send_logs():
+def send_logs(job_id: Optional[str] = None, fmt: str = Query("json", alias="format")):
     try:
-        result = send_to_watsonx(CLASSIFIED_LOGS_JSON)
+        result = send_to_watsonx(classified_path(job_id) if job_id else CLASSIFIED_LOGS_JSON, fmt)
         return {"status": "success", "message": result}
     except requests.HTTPError as e:
-        return {"status": "error", "message": str(e), "response": e.response.text}
\ No newline at end of file
+        return {"status": "error", "message": str(e), "response": e.response.text}
+    except (FileNotFoundError, JobNotFound):
+        # unknown job, or a job that has not been classified yet
+        return JSONResponse({"status": "error", "detail": "No classified logs found."}, status_code=404)
+    except RuntimeError as e:
+        # format=msgpack without msgpack installed
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
\ No newline at end of file
@@ -0,0 +1,220 @@
+# ioc_store.py
+"""
+Persistent cross-job IOC store.
+
+Every report ingests its extract_iocs output here (SQLite, one row per indicator per
+job). An in-memory Bloom filter sits in front of the table so indicators that were
+never seen before - the common case - are answered without touching SQLite, and
+"seen before?" lookups never scan past results.
+
+Several processes (API workers, watch mode, distributed coordinators) share one
+database, each with its own filter. Every new distinct indicator is also appended to
+ioc_log with an increasing seq; a filter (and its .bloom sidecar) records the last seq it
+covers and folds in newer rows whenever SQLite's data_version shows another connection
+has committed, so a miss never hides another process's write.
+"""
+import os
+import math
+import struct
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+IOC_STORE_DB = os.getenv("STAGEZERO_IOC_DB", os.path.join(os.getcwd(), "ioc_store.db"))
+BLOOM_CAPACITY = 1_000_000  # initial; the filter is rebuilt at double size when exceeded
+BLOOM_ERROR_RATE = 0.001
+SQL_BATCH = 500  # values per IN (...) query
+
+# -------------------- Bloom filter --------------------
+class BloomFilter:
+    HEADER = struct.Struct("<QQQQ")  # capacity, hash count, items added, last ioc_log seq covered
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        nbits = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.nbytes = (nbits + 7) // 8
+        self.nbits = self.nbytes * 8
+        self.k = max(1, round(self.nbits / capacity * math.log(2)))
+        self.bits = bytearray(self.nbytes)
+        self.count = 0
+        self.seq = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Kirsch-Mitzenmacher: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return ((h1 + i * h2) % self.nbits for i in range(self.k))
+
+    def add(self, key: str):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(self.HEADER.pack(self.capacity, self.k, self.count, self.seq))
+            fh.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, error_rate: float = BLOOM_ERROR_RATE) -> Optional["BloomFilter"]:
+        try:
+            with open(path, "rb") as fh:
+                capacity, k, count, seq = cls.HEADER.unpack(fh.read(cls.HEADER.size))
+                bloom = cls(capacity, error_rate)
+                bits = fh.read()
+        except (FileNotFoundError, struct.error):
+            return None
+        if k != bloom.k or len(bits) != bloom.nbytes:
+            return None
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        bloom.seq = seq
+        return bloom
+
+def _key(kind: str, value: str) -> str:
+    return f"{kind}\x00{value}"
+
+# -------------------- Store --------------------
+class IOCStore:
+    def __init__(self, db_path: str = IOC_STORE_DB):
+        self.db_path = db_path
+        self.bloom_path = db_path + ".bloom"
+        self.lock = threading.Lock()
+        self.data_version: Optional[int] = None
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS iocs (
+                kind TEXT NOT NULL, value TEXT NOT NULL,
+                PRIMARY KEY (kind, value)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ioc_jobs (
+                kind TEXT NOT NULL, value TEXT NOT NULL, job_id TEXT NOT NULL, seen_at TEXT NOT NULL,
+                PRIMARY KEY (kind, value, job_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ioc_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL, value TEXT NOT NULL
+            );
+        """)
+        self._backfill_log()
+        self.bloom = self._open_bloom()
+
+    def _backfill_log(self):
+        """Stores created before ioc_log existed: give their indicators a seq once."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if (self.conn.execute("SELECT 1 FROM ioc_log LIMIT 1").fetchone() is None
+                    and self.conn.execute("SELECT 1 FROM iocs LIMIT 1").fetchone() is not None):
+                self.conn.execute("INSERT INTO ioc_log (kind, value) SELECT kind, value FROM iocs")
+
+    def _open_bloom(self) -> BloomFilter:
+        last_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ioc_log").fetchone()[0]
+        bloom = BloomFilter.load(self.bloom_path)
+        if bloom is None or bloom.seq > last_seq:
+            # missing sidecar, or one written for a different database: rebuild once
+            return self._rebuild_bloom()
+        # an older sidecar (another process saved last, or this one crashed) just catches up
+        self.bloom = bloom
+        self._catch_up(force=True)
+        return self.bloom
+
+    def _rebuild_bloom(self) -> BloomFilter:
+        total = self.conn.execute("SELECT COUNT(*) FROM ioc_log").fetchone()[0]
+        capacity = BLOOM_CAPACITY
+        while capacity < total * 2:
+            capacity *= 2
+        bloom = BloomFilter(capacity)
+        self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        for seq, kind, value in self.conn.execute("SELECT seq, kind, value FROM ioc_log ORDER BY seq"):
+            bloom.add(_key(kind, value))
+            bloom.seq = seq
+        bloom.save(self.bloom_path)
+        return bloom
+
+    def _catch_up(self, force: bool = False):
+        """Fold indicators other processes committed since this filter's seq into it."""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version and not force:
+            return
+        self.data_version = version
+        for seq, kind, value in self.conn.execute(
+                "SELECT seq, kind, value FROM ioc_log WHERE seq > ? ORDER BY seq", (self.bloom.seq,)):
+            self.bloom.add(_key(kind, value))
+            self.bloom.seq = seq
+        if self.bloom.count > self.bloom.capacity:
+            self.bloom = self._rebuild_bloom()
+
+    def lookup(self, iocs: Dict[str, List[str]], exclude_job: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Prior sightings for each indicator: {kind: {value: {"first_seen", "first_job",
+        "prior_occurrences"}}}. Sightings from exclude_job (the current one) don't count.
+        Values missing from the Bloom filter are reported as new without a query.
+        """
+        out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        with self.lock:
+            self._catch_up()
+            for kind, values in iocs.items():
+                annotated = {v: {"first_seen": None, "first_job": None, "prior_occurrences": 0} for v in values}
+                maybe = [v for v in values if _key(kind, v) in self.bloom]
+                for i in range(0, len(maybe), SQL_BATCH):
+                    batch = maybe[i:i + SQL_BATCH]
+                    rows = self.conn.execute(
+                        f"SELECT value, COUNT(*), MIN(seen_at), job_id FROM ioc_jobs "
+                        f"WHERE kind = ? AND value IN ({','.join('?' * len(batch))}) AND job_id != ? "
+                        f"GROUP BY value",
+                        [kind, *batch, exclude_job or ""],
+                    )
+                    # SQLite returns job_id from the row that produced MIN(seen_at)
+                    for value, cnt, first_seen, first_job in rows:
+                        annotated[value] = {"first_seen": first_seen, "first_job": first_job, "prior_occurrences": cnt}
+                out[kind] = annotated
+        return out
+
+    def ingest(self, job_id: str, iocs: Dict[str, Iterable[str]], seen_at: Optional[str] = None) -> int:
+        """Record one job's indicators. Re-ingesting the same job is a no-op. Returns new distinct IOCs."""
+        seen_at = seen_at or datetime.utcnow().isoformat() + "Z"
+        rows: List[Tuple[str, str]] = [(k, v) for k, vals in iocs.items() for v in set(vals)]
+        with self.lock:
+            with self.conn:
+                # take the write lock first so no other process can commit a seq between
+                # catching up and our own inserts
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._catch_up(force=True)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO ioc_jobs (kind, value, job_id, seen_at) VALUES (?, ?, ?, ?)",
+                    [(k, v, job_id, seen_at) for k, v in rows],
+                )
+                added = 0
+                for k, v in rows:
+                    cur = self.conn.execute("INSERT OR IGNORE INTO iocs (kind, value) VALUES (?, ?)", (k, v))
+                    if cur.rowcount:
+                        cur = self.conn.execute("INSERT INTO ioc_log (kind, value) VALUES (?, ?)", (k, v))
+                        self.bloom.add(_key(k, v))
+                        self.bloom.seq = cur.lastrowid
+                        added += 1
+            if self.bloom.count > self.bloom.capacity:
+                self.bloom = self._rebuild_bloom()
+            elif added:
+                # the header's seq tells readers how far this copy goes, so whichever
+                # process saves last, a loader only has to catch up from there
+                self.bloom.save(self.bloom_path)
+        return added
+
+_STORE: Optional[IOCStore] = None
+_STORE_LOCK = threading.Lock()
+
+def get_ioc_store() -> IOCStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = IOCStore()
+        return _STORE
@@ -0,0 +1,122 @@
+# job_store.py
+"""
+Per-job result partitions.
+
+Each analysis gets its own directory under JOBS_DIR holding its job.json (status and
+metadata), classified_logs.json and report.md. All writes go to a temp file in the same
+directory and are renamed into place, so a reader never sees a half-written file and
+parallel pipelines never touch each other's results. The catalog is simply the set of
+job.json files, so no shared index file needs locking across worker processes.
+"""
+import os
+import re
+import uuid
+import tempfile
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from serialization import dumps, read_json
+
+JOBS_DIR = os.getenv("STAGEZERO_JOBS_DIR", os.path.join(os.getcwd(), "jobs"))
+CLASSIFIED_NAME = "classified_logs.json"
+REPORT_MD_NAME = "report.md"
+REPORT_JSON_NAME = "report.json"
+# pre-job single-run output (load_logs.py / classify_logs.py), served when no job id is given
+LEGACY_CLASSIFIED_JSON = os.path.join(os.getcwd(), CLASSIFIED_NAME)
+_JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class JobNotFound(Exception):
+    pass
+
+# -------------------- Atomic writes --------------------
+def atomic_write_bytes(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def atomic_write_text(path: str, text: str):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+def atomic_write_json(path: str, obj: Any, pretty: bool = False):
+    atomic_write_bytes(path, dumps(obj, pretty=pretty))
+
+# -------------------- Catalog --------------------
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+def job_dir(job_id: str) -> str:
+    if not job_id or not _JOB_ID_RE.match(job_id):
+        raise JobNotFound(f"invalid job id: {job_id!r}")
+    return os.path.join(JOBS_DIR, job_id)
+
+def job_path(job_id: str, name: str) -> str:
+    return os.path.join(job_dir(job_id), name)
+
+def create_job(source: str, **meta) -> str:
+    job_id = uuid.uuid4().hex[:12]
+    os.makedirs(job_dir(job_id))
+    now = _now()
+    atomic_write_json(job_path(job_id, "job.json"), {
+        "job_id": job_id, "source": source, "status": "running",
+        "created_at": now, "updated_at": now, **meta,
+    })
+    return job_id
+
+def get_job(job_id: str) -> Dict[str, Any]:
+    try:
+        return read_json(job_path(job_id, "job.json"))
+    except FileNotFoundError:
+        raise JobNotFound(f"unknown job: {job_id}")
+
+def update_job(job_id: str, **fields) -> Dict[str, Any]:
+    """Only the job's own pipeline updates its job.json, so read-modify-write is safe."""
+    job = get_job(job_id)
+    job.update(fields, updated_at=_now())
+    atomic_write_json(job_path(job_id, "job.json"), job)
+    return job
+
+def list_jobs() -> List[Dict[str, Any]]:
+    jobs = []
+    if not os.path.isdir(JOBS_DIR):
+        return jobs
+    for name in os.listdir(JOBS_DIR):
+        try:
+            jobs.append(get_job(name))
+        except (JobNotFound, ValueError):
+            continue
+    return sorted(jobs, key=lambda j: j.get("created_at", ""), reverse=True)
+
+# -------------------- Results --------------------
+def save_classified(job_id: str, classified: List[Dict[str, Any]]):
+    atomic_write_json(job_path(job_id, CLASSIFIED_NAME), classified)
+
+def save_report(job_id: str, report: Dict[str, Any]):
+    atomic_write_json(job_path(job_id, REPORT_JSON_NAME), report)
+
+def load_report(job_id: str) -> Optional[Dict[str, Any]]:
+    """Last stored deep report for a job (provisional triage report until the full run lands)."""
+    try:
+        return read_json(job_path(job_id, REPORT_JSON_NAME))
+    except FileNotFoundError:
+        return None
+
+def classified_path(job_id: str) -> str:
+    if not os.path.exists(job_path(job_id, "job.json")):
+        raise JobNotFound(f"unknown job: {job_id}")
+    return job_path(job_id, CLASSIFIED_NAME)
+
+def load_classified(job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """A job's classified logs, or the legacy global classified_logs.json when no job id is given."""
+    return read_json(classified_path(job_id) if job_id else LEGACY_CLASSIFIED_JSON)
+
+def report_md_path(job_id: Optional[str] = None) -> str:
+    """A job's report.md; without a job id, the shared report.md in the working directory."""
+    return job_path(job_id, REPORT_MD_NAME) if job_id else REPORT_MD_NAME
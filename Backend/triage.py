@@ -0,0 +1,347 @@
+# triage.py
+"""
+Fast-triage sampling for very large incident bundles.
+
+Instead of extracting and classifying everything, triage reads the archive index,
+groups members into strata by file type and size bucket, extracts only a byte-budgeted
+sample from every stratum, and caps records per sampled file. Members bigger than
+TRIAGE_MAX_FILE_BYTES are never extracted: a few evenly spaced chunks are read straight
+from the archive stream (within the first TRIAGE_STREAM_SPAN bytes, so a multi-GB member
+isn't decompressed end to end) and parsed as lines. IOC extraction and MITRE
+matching run on that sample only. Each sampled log carries a weight (how many logs in
+the full bundle it stands for), which turns sample hit rates into estimated tactic /
+technique frequencies with 95% Wilson confidence bounds.
+
+The estimates count logs showing a tactic/technique; the full deep report's tactic
+breakdown counts technique hits, so the two are comparable in ranking, not 1:1.
+"""
+import io
+import os
+import json
+import math
+import random
+import zipfile
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+from main import lazy_import, load_log_file, classify_logs_pipeline, build_deep_report, detect_bom
+
+TRIAGE_BYTE_BUDGET = int(os.getenv("STAGEZERO_TRIAGE_MB", "64")) * 1024 * 1024
+TRIAGE_MAX_FILES = 200
+TRIAGE_MAX_FILE_BYTES = 4 * 1024 * 1024  # bigger text files are read as a few spread-out chunks
+TRIAGE_CHUNKS = 4
+TRIAGE_STREAM_SPAN = int(os.getenv("STAGEZERO_TRIAGE_SPAN_MB", "512")) * 1024 * 1024
+TRIAGE_MAX_RECORDS_PER_FILE = 500
+TRIAGE_MAX_DEPTH = 3  # archives nested deeper than this are left out of the sample
+TRIAGE_SEED = 1337
+Z_95 = 1.96
+
+FILE_TYPES = {".txt": "text", ".log": "text", ".csv": "csv", ".json": "json", ".zip": "archive", ".7z": "archive"}
+
+# -------------------- Archive index --------------------
+def list_members(archive_path: str, password: Optional[str] = None) -> List[Tuple[str, int]]:
+    """(member name, uncompressed size) for every file in a .zip/.7z, without extracting."""
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path, "r") as z:
+            return [(i.filename, i.file_size) for i in z.infolist() if not i.is_dir()]
+    py7zr = lazy_import("py7zr")
+    with py7zr.SevenZipFile(archive_path, mode="r", password=password) as archive:
+        return [(f.filename, f.uncompressed or 0) for f in archive.list() if not f.is_directory]
+
+def extract_members(archive_path: str, names: List[str], out_dir: str, password: Optional[str] = None):
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path, "r") as z:
+            if password:
+                z.setpassword(password.encode())
+            for name in names:
+                z.extract(name, path=out_dir)
+        return
+    py7zr = lazy_import("py7zr")
+    with py7zr.SevenZipFile(archive_path, mode="r", password=password) as archive:
+        archive.extract(path=out_dir, targets=names)
+
+# -------------------- Stratified plan --------------------
+def stratum_of(name: str, size: int) -> Optional[Tuple[str, int]]:
+    ftype = FILE_TYPES.get(os.path.splitext(name.lower())[1])
+    if ftype is None:
+        return None
+    # size buckets grow 4x: <1KB, <4KB, <16KB, ... so similar files share a stratum
+    return ftype, int(math.log(max(size, 1), 4))
+
+def plan_sample(members: List[Tuple[str, int]], budget: int = TRIAGE_BYTE_BUDGET,
+                max_files: int = TRIAGE_MAX_FILES, seed: int = TRIAGE_SEED) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    """
+    Allocate the byte budget across strata in proportion to their size (at least one
+    file each) and pick files at random inside each stratum.
+    """
+    strata: Dict[Tuple[str, int], List[Tuple[str, int]]] = defaultdict(list)
+    for name, size in members:
+        key = stratum_of(name, size)
+        if key is not None:
+            strata[key].append((name, size))
+
+    rng = random.Random(seed)
+    total = sum(s for files in strata.values() for _, s in files) or 1
+    per_stratum_files = max(1, max_files // max(1, len(strata)))
+    plan = {}
+    for key, files in strata.items():
+        stratum_bytes = sum(s for _, s in files)
+        share = budget * stratum_bytes / total
+        rng.shuffle(files)
+        chosen, used = [], 0
+        for name, size in files:
+            if chosen and (used + min(size, TRIAGE_MAX_FILE_BYTES) > share or len(chosen) >= per_stratum_files):
+                break
+            chosen.append((name, size))
+            used += min(size, TRIAGE_MAX_FILE_BYTES)
+        plan[key] = {
+            "files": chosen,
+            "total_files": len(files),
+            "total_bytes": stratum_bytes,
+            "sampled_bytes": sum(s for _, s in chosen),
+        }
+    return plan
+
+# -------------------- Sample readers --------------------
+class _SampleComplete(Exception):
+    """Raised from the 7z writer once every chunk is in, to stop decompressing the member."""
+
+def chunk_ranges(size: int, max_bytes: int = TRIAGE_MAX_FILE_BYTES, chunks: int = TRIAGE_CHUNKS,
+                 span: int = TRIAGE_STREAM_SPAN) -> List[Tuple[int, int]]:
+    """Evenly spaced [lo, hi) byte ranges over the leading `span` bytes, 4-byte aligned for utf-16/32."""
+    span = min(size, span)
+    piece = (max_bytes // chunks) // 4 * 4
+    step = span // chunks
+    return [(lo, min(lo + piece, size)) for lo in (i * step // 4 * 4 for i in range(chunks))]
+
+class _ChunkWriter:
+    """py7zr writer that keeps only the bytes inside `ranges` of the member it receives."""
+
+    def __init__(self, ranges: List[Tuple[int, int]]):
+        self.ranges = ranges
+        self.parts = [bytearray() for _ in ranges]
+        self.pos = 0
+
+    def write(self, data) -> int:
+        start, end = self.pos, self.pos + len(data)
+        for (lo, hi), part in zip(self.ranges, self.parts):
+            if lo < end and hi > start:
+                part += data[max(lo, start) - start:min(hi, end) - start]
+        self.pos = end
+        if end >= self.ranges[-1][1]:
+            raise _SampleComplete()
+        return len(data)
+
+    def read(self, size=None) -> bytes:
+        return b""
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def size(self) -> int:
+        return self.pos
+
+    def close(self):
+        pass
+
+def read_member_chunks(archive_path: str, name: str, size: int, password: Optional[str] = None) -> List[bytes]:
+    """The chunk_ranges of one archive member, read from the decompression stream without extracting it."""
+    ranges = chunk_ranges(size)
+    if archive_path.lower().endswith(".zip"):
+        parts = []
+        with zipfile.ZipFile(archive_path, "r") as z:
+            with z.open(name, pwd=password.encode() if password else None) as fh:
+                for lo, hi in ranges:
+                    fh.seek(lo)  # forward seeks decompress and discard, nothing is buffered
+                    parts.append(fh.read(hi - lo))
+        return parts
+
+    py7zr = lazy_import("py7zr")
+    writer = _ChunkWriter(ranges)
+
+    class Factory(py7zr.io.WriterFactory):
+        def create(self, filename: str):
+            return writer
+
+    with py7zr.SevenZipFile(archive_path, mode="r", password=password) as archive:
+        try:
+            archive.extract(targets=[name], factory=Factory())
+        except _SampleComplete:
+            pass
+        except Exception as e:
+            # py7zr may wrap errors raised by the writer
+            if not isinstance(e.__cause__ or e.__context__, _SampleComplete) and writer.pos < ranges[-1][1]:
+                raise
+    return [bytes(p) for p in writer.parts]
+
+def chunk_lines(parts: List[bytes]) -> Tuple[str, List[str]]:
+    """(first line of the member, complete lines of every chunk); chunk edges cut lines, so those are dropped."""
+    codec, bom = detect_bom(parts[0][:4])
+    header, lines = "", []
+    for i, part in enumerate(parts):
+        text = part[bom if i == 0 else 0:].decode(codec, errors="ignore")
+        chunk = text.split("\n")
+        if i == 0:
+            header = chunk[0]
+        else:
+            chunk = chunk[1:]  # starts mid-line
+        lines.extend(line for line in chunk[:-1] if line.strip())  # last one may be cut short
+    return header, lines
+
+def sample_large_member(archive_path: str, name: str, size: int, filename: str, rng: random.Random,
+                        password: Optional[str] = None) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Logs from an oversized member plus its record weight, shaped like load_log_file's
+    output: one text entry for .txt/.log, one per row for CSV, one per object for JSON
+    (newline-delimited or one object per line inside an array).
+    """
+    parts = read_member_chunks(archive_path, name, size, password)
+    header, lines = chunk_lines(parts)
+    lower = name.lower()
+    if lower.endswith((".txt", ".log")) or not lines:
+        return [{"filename": filename, "text": "\n".join(lines)}] if lines else [], 1.0
+
+    if lower.endswith(".csv"):
+        pd = lazy_import("pandas")
+        body = "\n".join(lines if lines[0] == header else [header, *lines])
+        df = pd.read_csv(io.StringIO(body), on_bad_lines="skip")
+        if "text" in df.columns:
+            entries = [{"filename": filename, "text": str(t)} for t in df["text"]]
+        else:
+            entries = [{"filename": filename, "text": " ".join(r)} for r in df.astype(str).values.tolist()]
+    else:
+        entries = []
+        for line in lines:
+            try:
+                entries.append({"filename": filename, "text": json.dumps(json.loads(line.strip().rstrip(",")))})
+            except ValueError:
+                continue
+        if not entries:
+            # not line-oriented JSON: classify the sampled text as is, like load_log_file's fallback
+            return [{"filename": filename, "text": "\n".join(lines)}], 1.0
+
+    if not entries:
+        return [], 1.0
+    # records in the whole member, extrapolated from the records per sampled byte
+    sampled = sum(len(p) for p in parts)
+    estimated = max(len(entries), round(len(entries) * size / max(sampled, 1)))
+    kept = entries if len(entries) <= TRIAGE_MAX_RECORDS_PER_FILE else rng.sample(entries, TRIAGE_MAX_RECORDS_PER_FILE)
+    return kept, estimated / len(kept)
+
+def load_sampled_file(path: str, rng: random.Random) -> Tuple[List[Dict[str, Any]], float]:
+    """Logs from one extracted sample file plus the record-level weight (records in file / records kept)."""
+    entries = load_log_file(path)
+    if len(entries) <= TRIAGE_MAX_RECORDS_PER_FILE:
+        return entries, 1.0
+    kept = rng.sample(entries, TRIAGE_MAX_RECORDS_PER_FILE)
+    return kept, len(entries) / len(kept)
+
+def sample_archive(archive_path: str, out_dir: str, rng: random.Random, password: Optional[str] = None,
+                   budget: int = TRIAGE_BYTE_BUDGET, depth: int = 0) -> Tuple[Dict, List[Dict[str, Any]], List[float]]:
+    """
+    Stratified sample of one archive: (plan, logs, weights). A nested archive that makes
+    it into the sample is sampled the same way, within one file's share of the budget
+    (TRIAGE_MAX_FILE_BYTES), and its weights are scaled by the outer stratum's.
+    """
+    members = list_members(archive_path, password)
+    plan = plan_sample(members, budget=budget)
+    # oversized log files are streamed in chunks below; only the rest is written to disk
+    extract_members(archive_path, [name for p in plan.values() for name, size in p["files"]
+                                   if size <= TRIAGE_MAX_FILE_BYTES or name.lower().endswith((".zip", ".7z"))],
+                    out_dir, password)
+
+    logs, weights = [], []
+    for p in plan.values():
+        # each sampled byte stands for total_bytes / sampled_bytes bytes of its stratum
+        file_weight = p["total_bytes"] / p["sampled_bytes"] if p["sampled_bytes"] else 1.0
+        for name, size in p["files"]:
+            path = os.path.join(out_dir, name)
+            try:
+                if name.lower().endswith((".zip", ".7z")):
+                    if depth >= TRIAGE_MAX_DEPTH:
+                        print(f"⚠️ Triage skipped {name}: archives nested more than {TRIAGE_MAX_DEPTH} deep")
+                        continue
+                    _, entries, inner = sample_archive(path, path + "_sampled", rng, password,
+                                                       TRIAGE_MAX_FILE_BYTES, depth + 1)
+                    weights.extend(file_weight * w for w in inner)
+                else:
+                    if size > TRIAGE_MAX_FILE_BYTES:
+                        entries, record_weight = sample_large_member(archive_path, name, size, path, rng, password)
+                    else:
+                        entries, record_weight = load_sampled_file(path, rng)
+                    weights.extend([file_weight * record_weight] * len(entries))
+            except Exception as e:
+                print(f"⚠️ Triage could not read {name}: {e}")
+                continue
+            logs.extend(entries)
+    return plan, logs, weights
+
+# -------------------- Estimation --------------------
+def wilson_interval(p: float, n: int, z: float = Z_95) -> Tuple[float, float]:
+    if n == 0:
+        return 0.0, 1.0
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def estimate_frequencies(classified: List[Dict[str, Any]], weights: List[float], top: int = 15) -> Dict[str, Any]:
+    """Weighted hit rates -> estimated log counts with 95% bounds for tactics and techniques."""
+    n = len(classified)
+    population = sum(weights)
+    tactic_w = defaultdict(float)
+    tactic_n = defaultdict(int)
+    tech_w = defaultdict(float)
+    tech_n = defaultdict(int)
+    names = {}
+    for entry, w in zip(classified, weights):
+        tactics = set()
+        for m in entry.get("matched", []):
+            tech_w[m["id"]] += w
+            tech_n[m["id"]] += 1
+            names[m["id"]] = m["name"]
+            tactics.update(m.get("tactics", []))
+        for t in tactics:
+            tactic_w[t] += w
+            tactic_n[t] += 1
+
+    def rows(wsum: Dict[str, float], counts: Dict[str, int], label: str):
+        out = []
+        for key, w in sorted(wsum.items(), key=lambda x: x[1], reverse=True):
+            p = w / population if population else 0.0
+            lo, hi = wilson_interval(p, n)
+            row = {label: key, "sample_logs": counts[key], "estimated_logs": round(p * population),
+                   "share": round(p, 4), "ci_low": round(lo * population), "ci_high": round(hi * population)}
+            if label == "id":
+                row["name"] = names[key]
+            out.append(row)
+        return out
+
+    return {
+        "estimated_total_logs": round(population),
+        "tactics": rows(tactic_w, tactic_n, "tactic"),
+        "techniques": rows(tech_w, tech_n, "id")[:top],
+    }
+
+# -------------------- Entry point --------------------
+def triage_archive(archive_path: str, out_dir: str, job_id: Optional[str] = None,
+                   password: Optional[str] = None, md_path: str = "report.md") -> Dict[str, Any]:
+    """Sample, classify and build a provisional deep report for one uploaded archive."""
+    plan, logs, weights = sample_archive(archive_path, out_dir, random.Random(TRIAGE_SEED), password)
+
+    classified = classify_logs_pipeline(logs)
+    report = build_deep_report(classified, job_id=job_id, md_path=md_path)
+    report["provisional"] = True
+    report["triage"] = {
+        "total_files": sum(p["total_files"] for p in plan.values()),
+        "sampled_files": sum(len(p["files"]) for p in plan.values()),
+        "total_bytes": sum(p["total_bytes"] for p in plan.values()),
+        "sampled_bytes": sum(p["sampled_bytes"] for p in plan.values()),
+        "sampled_logs": len(classified),
+        "strata": len(plan),
+        **estimate_frequencies(classified, weights),
+    }
+    return report
@@ -0,0 +1,372 @@
+# watch_logs.py
+"""
+Continuous ingestion for a live log folder.
+
+Instead of re-walking LOGS_DIR and rewriting all_logs.json from scratch, this keeps a
+checkpoint per file (inode + byte offset for text logs and line-oriented CSV/JSON,
+record count for JSON arrays and CSVs with a text column),
+reads only what was appended since the last pass, classifies only that delta and
+appends it to the existing all_logs.json / classified_logs.json arrays in place.
+Byte-offset reads are capped at DELTA_MAX_BYTES per file per pass; a bigger backlog is
+drained over back-to-back passes so memory stays bounded.
+
+Usage:
+    python watch_logs.py                 # poll LOGS_DIR every 5 seconds
+    python watch_logs.py --once          # single incremental pass (cron friendly)
+    python watch_logs.py --logs-dir /var/log/collectors --interval 2
+    python watch_logs.py --seed --once   # checkpoint current files without emitting them
+
+Without a state file, an existing all_logs.json is assumed to already cover the folder
+(e.g. written by load_logs.py), so the first pass only seeds the checkpoints: offsets
+come from os.stat and record counts from a count-only pass, no entries are built.
+"""
+import io
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from typing import List, Dict, Any, Optional, Tuple
+
+from main import (lazy_import, load_log_file, classify_logs_pipeline, detect_bom,
+                  CLASSIFIED_LOGS_JSON, SCAN_WINDOW)
+from serialization import dumps, loads
+
+# -------------------- Configuration --------------------
+LOGS_DIR = "logs"  # same default as load_logs.py
+ALL_LOGS_JSON = os.path.join(os.getcwd(), "all_logs.json")
+STATE_FILE = os.path.join(os.getcwd(), "watch_state.json")
+POLL_INTERVAL = 5.0
+DELTA_MAX_BYTES = SCAN_WINDOW  # per file per pass, same slice size as classify_large_file
+HEAD_BYTES = 64 * 1024  # enough to see a CSV header or the start of a JSON document
+
+TEXT_EXTS = (".txt", ".log")
+RECORD_EXTS = (".csv", ".json")
+
+# -------------------- Checkpoints --------------------
+def load_state(path: str = STATE_FILE) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(state: Dict[str, Dict[str, Any]], path: str = STATE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2)
+    os.replace(tmp, path)
+
+def file_identity(st: os.stat_result) -> str:
+    """Device + inode; changes when a collector rotates the file under the same name."""
+    return f"{st.st_dev}:{st.st_ino}"
+
+# -------------------- Output folding --------------------
+def append_json_array(path: str, entries: List[Dict[str, Any]]):
+    """
+    Append entries to a JSON array file without reading or rewriting the existing items.
+    Only the closing bracket is rewritten, so cost is proportional to len(entries).
+    """
+    if not entries:
+        return
+    body = b",\n".join(dumps(e) for e in entries)
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, "wb") as fh:
+            fh.write(b"[\n" + body + b"\n]")
+        return
+
+    with open(path, "r+b") as fh:
+        # walk back over trailing whitespace to the closing bracket
+        pos = fh.seek(0, os.SEEK_END)
+        while pos > 0:
+            fh.seek(pos - 1)
+            ch = fh.read(1)
+            if not ch.isspace():
+                break
+            pos -= 1
+        if ch != b"]":
+            raise ValueError(f"{path} is not a JSON array")
+        close_pos = pos - 1
+
+        # is the array empty? look at the previous non-whitespace byte
+        prev = close_pos
+        while prev > 0:
+            fh.seek(prev - 1)
+            ch = fh.read(1)
+            if not ch.isspace():
+                break
+            prev -= 1
+        sep = b"\n" if ch == b"[" else b",\n"
+
+        fh.seek(close_pos)
+        fh.write(sep + body + b"\n]")
+        fh.truncate()
+
+# -------------------- Delta readers --------------------
+def detect_codec(file_path: str) -> Tuple[str, int]:
+    """Return (codec, bom_length) for a log file, using main's BOM table."""
+    with open(file_path, "rb") as fh:
+        return detect_bom(fh.read(4))
+
+def read_text_delta(file_path: str, ckpt: Dict[str, Any], size: int) -> Tuple[Optional[str], int]:
+    """
+    Read complete lines appended after ckpt['offset'], at most DELTA_MAX_BYTES of them.
+    A trailing partial line is left for the next pass so a record is never split; a
+    single line longer than the cap is cut at the cap rather than stalling the file.
+    """
+    codec = ckpt["codec"]
+    offset = max(ckpt["offset"], ckpt.get("bom", 0))
+    if size <= offset:
+        return None, offset
+
+    capped = size - offset > DELTA_MAX_BYTES
+    with open(file_path, "rb") as fh:
+        fh.seek(offset)
+        chunk = fh.read(min(size - offset, DELTA_MAX_BYTES))
+
+    newline = "\n".encode(codec)
+    cut = chunk.rfind(newline)
+    # rfind can land mid code unit for utf-16/32; step back to an aligned boundary
+    while cut > 0 and cut % len(newline):
+        cut = chunk.rfind(newline, 0, cut)
+    if cut < 0:
+        if not capped:
+            return None, offset
+        cut = len(chunk) - len(chunk) % len(newline) - len(newline)
+    chunk = chunk[:cut + len(newline)]
+    return chunk.decode(codec, errors="ignore"), offset + len(chunk)
+
+def read_head(file_path: str, ckpt: Dict[str, Any]) -> str:
+    with open(file_path, "rb") as fh:
+        fh.seek(ckpt["bom"])
+        data = fh.read(HEAD_BYTES)
+    return data.decode(ckpt["codec"], errors="ignore")
+
+def record_layout(file_path: str, ckpt: Dict[str, Any]) -> str:
+    """
+    'records' when load_log_file yields one entry per record (JSON array or object, CSV
+    with a text column), 'lines' when the whole file collapses into one entry
+    (newline-delimited JSON, CSV without a text column) and has to be tracked by offset.
+    """
+    head = read_head(file_path, ckpt)
+    if file_path.lower().endswith(".csv"):
+        header = next(csv.reader([head.split("\n", 1)[0].strip()]), [])
+        return "records" if "text" in header else "lines"
+    if head.lstrip().startswith("["):
+        return "records"
+    if os.path.getsize(file_path) > DELTA_MAX_BYTES:
+        # a file this big that isn't an array is appended line by line, not rewritten
+        return "lines"
+    try:
+        with open(file_path, "rb") as fh:
+            fh.seek(ckpt["bom"])
+            json.loads(fh.read().decode(ckpt["codec"], errors="ignore"))
+        return "records"
+    except ValueError:
+        return "lines"
+
+def count_records(file_path: str, ckpt: Dict[str, Any]) -> int:
+    """What len(load_log_file(file_path)) would be for a 'records' file, without building entries."""
+    if file_path.lower().endswith(".csv"):
+        pd = lazy_import("pandas")
+        # pandas wants the BOM-sniffing codec names when a BOM is present
+        enc = ckpt["codec"][:6] if ckpt["bom"] and ckpt["codec"] != "utf-8" else ("utf-8-sig" if ckpt["bom"] else "utf-8")
+        try:
+            return sum(len(c) for c in pd.read_csv(file_path, encoding=enc, usecols=["text"],
+                                                   on_bad_lines="skip", chunksize=100_000))
+        except Exception:
+            return 0
+    with open(file_path, "rb") as fh:
+        fh.seek(ckpt["bom"])
+        data = fh.read()
+    try:
+        doc = loads(data if ckpt["codec"] == "utf-8" else data.decode(ckpt["codec"], errors="ignore"))
+    except ValueError:
+        return 0
+    return len(doc) if isinstance(doc, list) else 1
+
+def seed_checkpoint(file_path: str, ckpt: Dict[str, Any], size: int):
+    """Mark everything currently in the file as already ingested, without reading it whole."""
+    ckpt["offset"] = ckpt["size"] = size
+    if file_path.lower().endswith(TEXT_EXTS):
+        return
+    ckpt["layout"] = record_layout(file_path, ckpt)
+    if ckpt["layout"] == "lines":
+        if file_path.lower().endswith(".csv"):
+            ckpt["header"] = read_head(file_path, ckpt).split("\n", 1)[0] + "\n"
+    else:
+        ckpt["records"] = count_records(file_path, ckpt)
+
+def read_line_records(file_path: str, ckpt: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+    """Complete lines appended to a line-oriented CSV/JSON file, shaped like load_log_file's entry."""
+    start = ckpt["offset"] <= ckpt["bom"]
+    text, offset = read_text_delta(file_path, ckpt, size)
+    ckpt["offset"] = offset
+    if not text or not text.strip():
+        return []
+    if file_path.lower().endswith(".csv"):
+        if start:
+            ckpt["header"] = text.split("\n", 1)[0] + "\n"
+            body = text
+        else:
+            # appended rows have no header of their own; parse them under the stored one
+            body = ckpt.get("header", "") + text
+        pd = lazy_import("pandas")
+        try:
+            df = pd.read_csv(io.StringIO(body), on_bad_lines="skip")
+        except Exception:
+            return []
+        text = "\n".join(df.astype(str).apply(lambda r: " ".join(r.values), axis=1).tolist())
+        if not text.strip():
+            return []
+    return [{"filename": file_path, "text": text}]
+
+def read_record_delta(file_path: str, ckpt: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+    """
+    JSON arrays and CSVs with a text column can't be parsed from a byte offset, so they
+    are re-parsed when they change, but only records past the checkpointed count are
+    emitted. Line-oriented files are read from their byte offset like text logs.
+    """
+    # a single JSON object may turn out to be the first line of an NDJSON file
+    if ckpt.get("layout") is None or (ckpt["layout"] == "records" and ckpt.get("records") == 1
+                                      and file_path.lower().endswith(".json")):
+        layout = record_layout(file_path, ckpt)
+        if layout == "lines" and ckpt.get("layout") == "records":
+            # e.g. a one-line NDJSON file that parsed as an object until more lines arrived:
+            # everything up to the last pass was already emitted
+            ckpt["offset"] = ckpt["size"]
+        ckpt["layout"] = layout
+    if ckpt["layout"] == "lines":
+        return read_line_records(file_path, ckpt, size)
+
+    entries = load_log_file(file_path)
+    seen = ckpt.get("records", 0)
+    if len(entries) < seen or len(entries) == seen == 1:
+        # rewritten in place (fewer records, or a single object that changed): re-emit
+        seen = 0
+    ckpt["records"] = len(entries)
+    return entries[seen:]
+
+# -------------------- Incremental pass --------------------
+def scan_once(logs_dir: str, state: Dict[str, Dict[str, Any]],
+              seed: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Collect new log entries under logs_dir and advance the checkpoints in `state`.
+    Returns (entries, files with more unread data than one pass takes). With seed=True
+    new or changed files are only checkpointed at their current end.
+    """
+    new_logs: List[Dict[str, Any]] = []
+    pending = 0
+
+    for root, dirs, files in os.walk(logs_dir):
+        for fname in files:
+            lower = fname.lower()
+            if not lower.endswith(TEXT_EXTS + RECORD_EXTS):
+                continue
+            file_path = os.path.join(root, fname)
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+
+            ident = file_identity(st)
+            ckpt = state.get(file_path)
+            # new file, rotated file (new inode) or truncated file: start from scratch
+            if ckpt is None or ckpt.get("inode") != ident or st.st_size < ckpt.get("size", 0):
+                ckpt = {"inode": ident, "offset": 0, "size": 0, "mtime": 0, "records": 0}
+            if "codec" not in ckpt:
+                ckpt["codec"], ckpt["bom"] = detect_codec(file_path)
+
+            if st.st_size == ckpt["size"] and st.st_mtime == ckpt["mtime"]:
+                state[file_path] = ckpt
+                continue
+
+            capped = (not seed and ckpt.get("layout") != "records"
+                      and st.st_size - ckpt["offset"] > DELTA_MAX_BYTES)
+            try:
+                if seed:
+                    seed_checkpoint(file_path, ckpt, st.st_size)
+                elif lower.endswith(TEXT_EXTS):
+                    text, offset = read_text_delta(file_path, ckpt, st.st_size)
+                    ckpt["offset"] = offset
+                    # only mark the file as consumed up to the last complete line
+                    ckpt["size"] = offset
+                    if text and text.strip():
+                        new_logs.append({"filename": file_path, "text": text})
+                else:
+                    new_logs.extend(read_record_delta(file_path, ckpt, st.st_size))
+                    ckpt["size"] = ckpt["offset"] if ckpt["layout"] == "lines" else st.st_size
+                ckpt["mtime"] = st.st_mtime
+                if capped:
+                    pending += 1
+            except Exception as e:
+                print(f"⚠️ Error reading {file_path}: {e}")
+            state[file_path] = ckpt
+
+    # forget files that disappeared so a re-created path is ingested again
+    for path in [p for p in state if not os.path.exists(p)]:
+        del state[path]
+
+    return new_logs, pending
+
+def ingest_delta(logs_dir: str = LOGS_DIR, state_file: str = STATE_FILE,
+                 all_logs_file: str = ALL_LOGS_JSON, classified_file: str = CLASSIFIED_LOGS_JSON,
+                 seed: Optional[bool] = None) -> Dict[str, int]:
+    """
+    One incremental pass. With seed=True the checkpoints are advanced to the current end
+    of every file and nothing is emitted; seed=None does that only on the very first pass
+    when all_logs.json already exists, so files load_logs.py ingested aren't duplicated.
+    """
+    if seed is None:
+        seed = not os.path.exists(state_file) and os.path.exists(all_logs_file)
+    state = load_state(state_file)
+    new_logs, pending = scan_once(logs_dir, state, seed=seed)
+    if seed:
+        save_state(state, state_file)
+        return {"new_logs": 0, "matched": 0, "tracked_files": len(state), "seeded": True, "pending": 0}
+
+    classified = classify_logs_pipeline(new_logs) if new_logs else []
+
+    # outputs first, checkpoint last: a crash in between re-reads the delta rather than losing it
+    append_json_array(all_logs_file, new_logs)
+    append_json_array(classified_file, classified)
+    save_state(state, state_file)
+
+    return {
+        "new_logs": len(new_logs),
+        "matched": sum(1 for c in classified if c["matched"]),
+        "tracked_files": len(state),
+        "pending": pending,
+    }
+
+def watch(logs_dir: str = LOGS_DIR, interval: float = POLL_INTERVAL, once: bool = False,
+          seed: Optional[bool] = None):
+    print(f"👀 Watching {logs_dir} (state: {STATE_FILE})")
+    while True:
+        stats = ingest_delta(logs_dir, seed=seed)
+        seed = None  # only the first pass can seed
+        if stats.get("seeded"):
+            print(f"📌 Checkpointed {stats['tracked_files']} existing files without re-emitting them")
+        if stats["new_logs"]:
+            print(f"📊 +{stats['new_logs']} logs, {stats['matched']} with matches "
+                  f"({stats['tracked_files']} files tracked)")
+        if once:
+            return stats
+        if not stats["pending"]:
+            # files with a backlog bigger than one pass are drained without waiting
+            time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest and classify a live log folder.")
+    parser.add_argument("--logs-dir", default=LOGS_DIR)
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="poll interval in seconds")
+    parser.add_argument("--once", action="store_true", help="run a single incremental pass and exit")
+    parser.add_argument("--seed", action="store_true", default=None,
+                        help="checkpoint the current files without emitting them")
+    args = parser.parse_args()
+    try:
+        watch(args.logs_dir, args.interval, args.once, args.seed)
+    except KeyboardInterrupt:
+        sys.exit(0)